@@ -3,9 +3,11 @@
 Script to download and add real plant images to the database
 """
 import requests
-import base64
 from pymongo import MongoClient
+import asyncio
 import os
+from image_pipeline import ImageProcessingError
+from image_store import store_image
 
 # Image URLs from vision expert
 plant_images = {
@@ -21,13 +23,13 @@ plant_images = {
     "Triphala": "https://images.pexels.com/photos/1684990/pexels-photo-1684990.jpeg?w=400"
 }
 
-def download_and_convert_to_base64(url):
-    """Download image and convert to base64"""
+def download_image(url):
+    """Download image bytes"""
     try:
         headers = {'User-Agent': 'Mozilla/5.0'}
         response = requests.get(url, timeout=15, headers=headers)
         if response.status_code == 200:
-            return base64.b64encode(response.content).decode('utf-8')
+            return response.content
     except Exception as e:
         print(f"Error downloading {url}: {e}")
     return None
@@ -39,24 +41,38 @@ db = client.ayurvedic_plants
 plants_collection = db.plants
 
 print("Downloading and adding plant images...")
-updated_count = 0
+downloaded = {}
 
 for plant_name, image_url in plant_images.items():
-    print(f"Processing {plant_name}...")
-    base64_image = download_and_convert_to_base64(image_url)
-    
-    if base64_image:
-        # Update plant in database
-        result = plants_collection.update_one(
-            {"name": plant_name},
-            {"$set": {"images_base64": [base64_image]}}
-        )
-        if result.modified_count > 0:
-            updated_count += 1
-            print(f"  ✅ Updated {plant_name} with image ({len(base64_image)} chars)")
-        else:
-            print(f"  ⚠️ {plant_name} not found in database")
+    print(f"Downloading {plant_name}...")
+    image_bytes = download_image(image_url)
+    if image_bytes:
+        downloaded[plant_name] = image_bytes
     else:
         print(f"  ❌ Failed to download image for {plant_name}")
 
+async def store_downloaded_images():
+    """Store each image and its variants; identical photos share the same hashes"""
+    stored = {}
+    for plant_name, image_bytes in downloaded.items():
+        try:
+            stored[plant_name] = await store_image(image_bytes)
+        except ImageProcessingError as e:
+            print(f"  ❌ Could not process image for {plant_name}: {e}")
+    return stored
+
+updated_count = 0
+
+for plant_name, image_refs in asyncio.run(store_downloaded_images()).items():
+    # Update plant in database
+    result = plants_collection.update_one(
+        {"name": plant_name},
+        {"$set": {"images": [image_refs]}}
+    )
+    if result.modified_count > 0:
+        updated_count += 1
+        print(f"  ✅ Updated {plant_name} with image ({image_refs['original'][:12]})")
+    else:
+        print(f"  ⚠️ {plant_name} not found in database")
+
 print(f"\n✅ Successfully updated {updated_count} plants with images!")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Compute the phonetic `search_keys` of plants written without them (seed
+scripts, older documents), or with keys from an older transliteration
+"""
+import asyncio
+from name_index import plant_search_keys
+import database
+
+NAME_FIELDS = {
+    "name": 1, "sanskrit_name": 1, "synonyms": 1, "vernacular_names": 1, "search_keys": 1
+}
+
+
+async def backfill_plants():
+    updated = 0
+    async for plant in database.db.plants.find({}, NAME_FIELDS):
+        keys = plant_search_keys(plant)
+        if plant.get("search_keys") == keys:
+            continue
+        await database.db.plants.update_one({"_id": plant["_id"]}, {"$set": {"search_keys": keys}})
+        updated += 1
+        print(f"  ✅ {plant.get('name', plant['_id'])} ({len(keys)} keys)")
+    return updated
+
+
+async def main():
+    await database.plants.ensure_indexes()
+    print("Computing plant search keys...")
+    updated = await backfill_plants()
+    print(f"\n✅ Updated {updated} plants")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
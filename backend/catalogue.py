@@ -0,0 +1,96 @@
+"""
+Keeps in-memory catalogue indexes in sync with the plants collection.
+Indexes register here and receive every plant document (projected to the
+fields they declare): a full rebuild at startup and periodically, and
+incremental adds for plants created through the API or inserted by the seed
+scripts (picked up by polling for newer `_id`s).
+"""
+from bson import ObjectId
+from typing import List
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# New plants inserted by other processes (seed scripts) show up within this interval
+CATALOGUE_POLL_SECONDS = float(os.getenv("CATALOGUE_POLL_SECONDS", "30"))
+# Full rebuild to pick up in-place updates of existing plants
+CATALOGUE_REBUILD_SECONDS = float(os.getenv("CATALOGUE_REBUILD_SECONDS", "900"))
+
+
+class Catalogue:
+    def __init__(self, collection):
+        self.collection = collection
+        self.indexes = []
+        self._last_id = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def register(self, index):
+        """`index` provides `fields`, `rebuild(plants)` and `add(plant)`"""
+        self.indexes.append(index)
+
+    def _projection(self) -> dict:
+        fields = set()
+        for index in self.indexes:
+            fields.update(index.fields)
+        return {field: 1 for field in fields}
+
+    async def _fetch(self, query: dict) -> List[dict]:
+        cursor = self.collection.find(query, self._projection()).sort("_id", 1)
+        return await cursor.to_list(length=None)
+
+    async def rebuild(self):
+        async with self._lock:
+            plants = await self._fetch({})
+            for index in self.indexes:
+                index.rebuild(plants)
+            if plants:
+                self._last_id = plants[-1]["_id"]
+
+    async def refresh(self):
+        """Add plants inserted since the last rebuild/refresh"""
+        async with self._lock:
+            query = {"_id": {"$gt": self._last_id}} if self._last_id else {}
+            for plant in await self._fetch(query):
+                self._add(plant)
+
+    def _add(self, plant: dict):
+        for index in self.indexes:
+            index.add(plant)
+        if isinstance(plant["_id"], ObjectId) and (self._last_id is None or plant["_id"] > self._last_id):
+            self._last_id = plant["_id"]
+
+    async def add(self, plant: dict):
+        """Index a plant written by this process right away"""
+        plant = dict(plant, _id=ObjectId(str(plant["_id"])))
+        async with self._lock:
+            self._add(plant)
+
+    async def start(self):
+        await self.rebuild()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        since_rebuild = 0.0
+        while True:
+            await asyncio.sleep(CATALOGUE_POLL_SECONDS)
+            since_rebuild += CATALOGUE_POLL_SECONDS
+            try:
+                if since_rebuild >= CATALOGUE_REBUILD_SECONDS:
+                    await self.rebuild()
+                    since_rebuild = 0.0
+                else:
+                    await self.refresh()
+            except Exception:
+                logger.exception("Catalogue index refresh failed")
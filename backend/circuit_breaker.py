@@ -0,0 +1,156 @@
+"""
+Circuit breaker for the upstream identification provider.
+Closed: calls go through and their outcomes fill a sliding window. When the
+failure or slow-call rate in the window crosses its threshold the breaker
+opens and calls fail fast with CircuitOpen. After a cool-down it goes
+half-open and lets a few probe calls through: enough successes close it
+again, any failure re-opens it.
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "50"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+# Must be below the per-attempt timeout (LLM_ATTEMPT_TIMEOUT_SECONDS), which
+# cuts every call off before it could count as slow otherwise
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "15"))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "3"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Identification service unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, is_failure=lambda error: True, slow_call_seconds: float = None):
+        """`is_failure(error)` decides which exceptions count against the provider"""
+        self.is_failure = is_failure
+        self.slow_call_seconds = BREAKER_SLOW_CALL_SECONDS if slow_call_seconds is None else slow_call_seconds
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.transitions = deque(maxlen=20)
+
+    def _transition(self, state: str, reason: str):
+        logger.warning("Identification circuit %s -> %s: %s", self.state, state, reason)
+        self.transitions.append({
+            "from": self.state, "to": state, "reason": reason, "at": datetime.utcnow()
+        })
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != CLOSED:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + BREAKER_OPEN_SECONDS - time.monotonic())
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright"""
+        return self.state == OPEN and self._retry_after() > 0 or (
+            self.state == HALF_OPEN and self._probes_in_flight >= BREAKER_HALF_OPEN_PROBES
+        )
+
+    def check(self):
+        """Raise CircuitOpen if calls are being rejected, without admitting one"""
+        if self.is_open():
+            self.rejected += 1
+            raise CircuitOpen(self._retry_after() or BREAKER_OPEN_SECONDS)
+
+    def _admit(self):
+        if self.state == OPEN and self._retry_after() <= 0:
+            self._transition(HALF_OPEN, "cool-down elapsed")
+        if self.state == OPEN or (
+            self.state == HALF_OPEN and self._probes_in_flight >= BREAKER_HALF_OPEN_PROBES
+        ):
+            self.rejected += 1
+            raise CircuitOpen(self._retry_after() or BREAKER_OPEN_SECONDS)
+        if self.state == HALF_OPEN:
+            self._probes_in_flight += 1
+
+    def _rates(self) -> tuple:
+        calls = len(self._outcomes)
+        if not calls:
+            return 0.0, 0.0
+        return (
+            sum(failed for failed, _ in self._outcomes) / calls,
+            sum(slow for _, slow in self._outcomes) / calls
+        )
+
+    def _record(self, failed: bool, slow: bool):
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed:
+                self._transition(OPEN, "probe failed")
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= BREAKER_HALF_OPEN_PROBES:
+                    self._transition(CLOSED, "probes succeeded")
+            return
+        if self.state != CLOSED:
+            return
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < BREAKER_MIN_CALLS:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= BREAKER_FAILURE_RATE:
+            self._transition(OPEN, f"failure rate {failure_rate:.0%}")
+        elif slow_rate >= BREAKER_SLOW_CALL_RATE:
+            self._transition(OPEN, f"slow call rate {slow_rate:.0%}")
+
+    @asynccontextmanager
+    async def guard(self):
+        """Admit the body (or raise CircuitOpen) and record its outcome"""
+        self._admit()
+        probe = self.state == HALF_OPEN
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if isinstance(e, Exception) and self.is_failure(e):
+                self._record(True, False)
+            elif probe and self.state == HALF_OPEN:
+                # A probe that ended without a verdict (cancelled, bad request) frees its slot
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            raise
+        self._record(False, time.monotonic() - started >= self.slow_call_seconds)
+
+    async def call(self, func, *args):
+        async with self.guard():
+            return await func(*args)
+
+    def stats(self) -> dict:
+        failure_rate, slow_rate = self._rates()
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "failure_rate": round(failure_rate, 4),
+            "slow_call_rate": round(slow_rate, 4),
+            "rejected": self.rejected,
+            "retry_after_seconds": round(self._retry_after(), 1) if self.state == OPEN else None,
+            "transitions": list(self.transitions)
+        }
@@ -0,0 +1,52 @@
+"""
+Consensus over several identifications of the same specimen
+(e.g. leaf, flower and bark photos submitted together).
+"""
+from collections import defaultdict
+
+CONFIDENCE_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+CONFIDENCE_LEVELS = ["low", "medium", "high"]
+LIST_FIELDS = ("characteristics", "medicinal_properties", "uses", "parts_used")
+
+
+def identification_key(plant_data: dict) -> str:
+    """Group by genus + species when available, otherwise by common name"""
+    scientific = " ".join((plant_data.get("scientific_name") or "").split()[:2]).casefold()
+    if scientific and scientific != "n/a":
+        return scientific
+    return (plant_data.get("plant_name") or "unknown").strip().casefold()
+
+
+def merge_identifications(identifications: list) -> tuple:
+    """
+    Confidence-weighted vote over plant_data dicts.
+    Returns (merged plant_data, agreement ratio among the inputs).
+    """
+    votes = defaultdict(int)
+    groups = defaultdict(list)
+    for plant_data in identifications:
+        key = identification_key(plant_data)
+        votes[key] += CONFIDENCE_WEIGHTS.get(plant_data.get("confidence"), 1)
+        groups[key].append(plant_data)
+
+    winner = max(votes, key=votes.get)
+    agreeing = sorted(
+        groups[winner],
+        key=lambda d: CONFIDENCE_WEIGHTS.get(d.get("confidence"), 1),
+        reverse=True
+    )
+    merged = dict(agreeing[0])
+    for field in LIST_FIELDS:
+        # Union in confidence order, keeping first occurrences
+        seen = {}
+        for plant_data in agreeing:
+            for item in plant_data.get(field) or []:
+                seen.setdefault(str(item).casefold(), item)
+        merged[field] = list(seen.values())
+
+    agreement = len(agreeing) / len(identifications)
+    if agreement < 1:
+        # Disagreement between photos lowers the overall confidence one level
+        level = CONFIDENCE_LEVELS.index(merged.get("confidence", "low")) if merged.get("confidence") in CONFIDENCE_LEVELS else 0
+        merged["confidence"] = CONFIDENCE_LEVELS[max(level - 1, 0)]
+    return merged, round(agreement, 3)
@@ -0,0 +1,166 @@
+"""
+Async MongoDB data layer (motor) for the API server.
+All request handlers go through these repositories so no Mongo round-trip
+ever blocks the event loop.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/ayurvedic_plants")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+
+client = AsyncIOMotorClient(MONGO_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+db = client.ayurvedic_plants
+
+# Fields needed to render a plant card in list views
+PLANT_CARD_FIELDS = ["name", "sanskrit_name", "scientific_name", "family", "description"]
+
+
+class UserRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("username", unique=True)
+
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        return await self.collection.find_one({"username": username})
+
+    async def create(self, user_dict: dict) -> str:
+        result = await self.collection.insert_one(user_dict)
+        return str(result.inserted_id)
+
+
+class PlantRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("name")
+        await self.collection.create_index("scientific_name")
+
+    async def list_cards(
+        self, query: dict, skip: int, limit: int, after: Optional[ObjectId] = None
+    ) -> List[dict]:
+        """
+        List card fields plus the first image's thumbnail hash, in `_id`
+        order; `after` continues from a previous page's last `_id`
+        """
+        projection = {field: 1 for field in PLANT_CARD_FIELDS}
+        projection["thumbnail_hash"] = {"$arrayElemAt": ["$images.thumbnail", 0]}
+        if after is not None:
+            query = {**query, "_id": {"$gt": after}}
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"_id": 1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$project": projection},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+    async def list_cards_by_ids(self, plant_ids: List[str]) -> List[dict]:
+        """Card fields for the given plants, in the given order"""
+        if not plant_ids:
+            return []
+        cards = await self.list_cards(
+            {"_id": {"$in": [ObjectId(plant_id) for plant_id in plant_ids]}}, 0, len(plant_ids)
+        )
+        by_id = {str(card["_id"]): card for card in cards}
+        return [by_id[plant_id] for plant_id in plant_ids if plant_id in by_id]
+
+    async def count(self, query: dict) -> int:
+        return await self.collection.count_documents(query)
+
+    async def get(self, plant_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": ObjectId(plant_id)})
+
+    async def find_one(self, query: dict) -> Optional[dict]:
+        return await self.collection.find_one(query)
+
+    async def create(self, plant_dict: dict) -> str:
+        result = await self.collection.insert_one(plant_dict)
+        return str(result.inserted_id)
+
+
+class ScanRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        # History pages are range scans on (timestamp, _id) within a user
+        await self.collection.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
+
+    async def create(self, scan_dict: dict) -> str:
+        result = await self.collection.insert_one(scan_dict)
+        return str(result.inserted_id)
+
+    async def create_many(self, scan_dicts: List[dict]) -> List[str]:
+        result = await self.collection.insert_many(scan_dicts)
+        return [str(scan_id) for scan_id in result.inserted_ids]
+
+    async def history(
+        self, user_id: str, skip: int, limit: int,
+        before: Optional[Tuple[Optional[datetime], ObjectId]] = None
+    ) -> List[dict]:
+        """
+        A user's scans, newest first; `before` continues from a previous
+        page's last (timestamp, _id)
+        """
+        query = {"user_id": user_id}
+        timestamp = None
+        if before is not None:
+            timestamp, scan_id = before
+            if timestamp is None:
+                # Old scans saved without a timestamp sort last, by _id
+                query.update({"timestamp": None, "_id": {"$lt": scan_id}})
+            else:
+                query["$or"] = [
+                    {"timestamp": {"$lt": timestamp}},
+                    {"timestamp": timestamp, "_id": {"$lt": scan_id}},
+                ]
+        scans = await self._history_page(query, skip, limit)
+        if timestamp is not None and len(scans) < limit:
+            # Past the timestamped scans, continue with the untimestamped ones.
+            # A null branch in the $or above could not use the index bounds
+            scans += await self._history_page({"user_id": user_id, "timestamp": None}, 0, limit - len(scans))
+        return scans
+
+    async def _history_page(self, query: dict, skip: int, limit: int) -> List[dict]:
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"timestamp": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$project": {
+                "identified_plant_name": 1,
+                "confidence": 1,
+                "timestamp": 1,
+                "thumbnail_hash": "$scanned_image.thumbnail",
+            }},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+    async def count_by_plant_name(self) -> Dict[str, int]:
+        """Number of scans per identified plant name"""
+        pipeline = [{"$group": {"_id": "$identified_plant_name", "count": {"$sum": 1}}}]
+        counts = await self.collection.aggregate(pipeline).to_list(length=None)
+        return {row["_id"]: row["count"] for row in counts if row["_id"]}
+
+
+users = UserRepository(db.users)
+plants = PlantRepository(db.plants)
+scans = ScanRepository(db.scans)
+
+
+async def ensure_indexes():
+    """Create all collection indexes (called once at app startup)"""
+    await users.ensure_indexes()
+    await plants.ensure_indexes()
+    await scans.ensure_indexes()
@@ -0,0 +1,149 @@
+"""
+Typo-tolerant lookup of catalogue plants by name (SymSpell-style).
+Every word of every plant name (common, scientific, Sanskrit, synonym and
+vernacular) is stored with all its deletion variants up to the maximum edit
+distance, so "neam" -> "nem" <- "neem" finds candidates with a few dict
+lookups; candidates are then verified with a bounded edit distance.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import time
+from dotenv import load_dotenv
+from metrics import LatencyTracker
+from name_index import bounded_edit_distance, normalize_name, plant_keys
+
+load_dotenv()
+
+FUZZY_MAX_DISTANCE = int(os.getenv("FUZZY_MAX_DISTANCE", "2"))
+# Deletes are generated from this many leading characters only, which keeps
+# the dictionary small for long names; candidates are verified on full words
+PREFIX_LENGTH = 7
+MIN_WORD_LENGTH = 3
+
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "sanskrit_name": 4.0,
+    "scientific_name": 4.0,
+    "botanical_synonyms": 3.0,
+    "vernacular_names": 3.0,
+    "synonyms": 2.0,
+}
+
+
+def max_distance(word: str) -> int:
+    """Edits allowed for a query word: none for short words, more for long ones"""
+    if len(word) < 4:
+        return 0
+    return min(FUZZY_MAX_DISTANCE, 1 if len(word) < 8 else 2)
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """The word's prefix with up to `distance` characters deleted"""
+    variants = {word[:PREFIX_LENGTH]}
+    frontier = set(variants)
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - variants
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    fields = tuple(FIELD_WEIGHTS)
+
+    def __init__(self):
+        self._words: Dict[str, Dict[str, float]] = {}  # word -> {plant_id: weight}
+        self._deletes: Dict[str, Set[str]] = {}  # deletion variant -> words
+        self._plant_words: Dict[str, List[str]] = {}
+        self.latency = LatencyTracker()
+
+    def rebuild(self, plants: List[dict]):
+        index = FuzzyIndex()
+        for plant in plants:
+            index.add(plant)
+        self._words, self._deletes, self._plant_words = index._words, index._deletes, index._plant_words
+
+    def add(self, plant: dict):
+        plant_id = str(plant["_id"])
+        self.remove(plant_id)
+        weights: Dict[str, float] = {}
+        for key, field in plant_keys(plant):
+            for word in key.split():
+                if len(word) >= MIN_WORD_LENGTH:
+                    weights[word] = max(weights.get(word, 0.0), FIELD_WEIGHTS[field])
+        for word, weight in weights.items():
+            if word not in self._words:
+                self._words[word] = {}
+                for variant in deletes(word, FUZZY_MAX_DISTANCE):
+                    self._deletes.setdefault(variant, set()).add(word)
+            self._words[word][plant_id] = weight
+        self._plant_words[plant_id] = list(weights)
+
+    def remove(self, plant_id: str):
+        for word in self._plant_words.pop(plant_id, []):
+            owners = self._words.get(word)
+            if owners is None:
+                continue
+            owners.pop(plant_id, None)
+            if owners:
+                continue
+            del self._words[word]
+            for variant in deletes(word, FUZZY_MAX_DISTANCE):
+                words = self._deletes.get(variant)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._deletes[variant]
+
+    def lookup(self, word: str) -> List[Tuple[str, int]]:
+        """Indexed words within the allowed edit distance, closest and most common first"""
+        limit = max_distance(word)
+        if word in self._words and limit == 0:
+            return [(word, 0)]
+        candidates = set()
+        for variant in deletes(word, limit):
+            candidates |= self._deletes.get(variant, set())
+        matches = []
+        for candidate in candidates:
+            distance = bounded_edit_distance(word, candidate, limit)
+            if distance is not None:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda match: (match[1], -len(self._words[match[0]]), match[0]))
+        return matches
+
+    def search(self, query: str) -> Tuple[List[str], Optional[str]]:
+        """
+        (plant ids whose names match every query word within the edit
+        distance, best first; the corrected query, if it differs)
+        """
+        started = time.perf_counter()
+        words = normalize_name(query).split()
+        totals: Optional[Dict[str, float]] = None
+        corrected = []
+        for word in words:
+            matches = self.lookup(word)
+            if not matches:
+                totals = {}
+                break
+            corrected.append(matches[0][0])
+            scores: Dict[str, float] = {}
+            for candidate, distance in matches:
+                for plant_id, weight in self._words[candidate].items():
+                    scores[plant_id] = max(scores.get(plant_id, 0.0), weight / (1 + distance))
+            totals = scores if totals is None else {
+                plant_id: total + scores[plant_id]
+                for plant_id, total in totals.items() if plant_id in scores
+            }
+        totals = totals or {}
+        suggestion = " ".join(corrected)
+        self.latency.observe(time.perf_counter() - started)
+        return (
+            sorted(totals, key=lambda plant_id: -totals[plant_id]),
+            suggestion if totals and suggestion != " ".join(words) else None
+        )
+
+    def stats(self) -> dict:
+        return {
+            "words": len(self._words),
+            "deletes": len(self._deletes),
+            "query_latency": self.latency.snapshot()
+        }
@@ -0,0 +1,180 @@
+"""
+Idempotency-Key support for non-idempotent POST endpoints.
+The first request with a key claims it in Mongo (TTL-indexed) and stores its
+response; replays get the stored response instead of re-running the work.
+A retry that arrives while the first request is still running (the client
+timed out) waits for its response: in-process through SingleFlight, across
+workers by polling the claim. Completed responses are also kept in an
+in-process map as a fast path.
+"""
+from fastapi import HTTPException
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dotenv import load_dotenv
+from singleflight import SingleFlight
+
+load_dotenv()
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# A claim older than this is assumed to belong to a crashed request
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+IDEMPOTENCY_LOCAL_SIZE = int(os.getenv("IDEMPOTENCY_LOCAL_SIZE", "10000"))
+# How long a retry waits for a request still running in another worker
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+IDEMPOTENCY_POLL_SECONDS = 0.5
+# Limit on the Idempotency-Key header value itself
+MAX_KEY_LENGTH = 255
+
+
+def validate_key(key: Optional[str]):
+    if key is not None and len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+
+def fingerprint(payload) -> str:
+    """Stable hash of a request payload (bytes or JSON-serializable)"""
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, collection):
+        self.collection = collection
+        self._local = OrderedDict()  # key -> (expires_at, request_hash, response)
+        self._flights = SingleFlight()
+        self.replays = 0
+        self.waits = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+
+    def _local_get(self, key: str):
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[key]
+            return None
+        return entry
+
+    def _local_put(self, key: str, request_hash: str, response: dict):
+        self._local[key] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, request_hash, response)
+        self._local.move_to_end(key)
+        while len(self._local) > IDEMPOTENCY_LOCAL_SIZE:
+            self._local.popitem(last=False)
+
+    @staticmethod
+    def _check_same_request(request_hash: str, stored_hash: str):
+        if stored_hash != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    def _replay(self, request_hash: str, stored_hash: str, response: dict) -> dict:
+        self._check_same_request(request_hash, stored_hash)
+        self.replays += 1
+        return response
+
+    async def _claim(self, key: str, request_hash: str) -> Optional[Tuple[str, dict]]:
+        """
+        Claim the key; returns (request_hash, response) stored by an earlier
+        request once it has completed
+        """
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        waited = False
+        while True:
+            now = datetime.utcnow()
+            try:
+                await self.collection.insert_one({
+                    "_id": key,
+                    "request_hash": request_hash,
+                    "status": "in_progress",
+                    "created_at": now
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+
+            doc = await self.collection.find_one({"_id": key})
+            if doc and doc["status"] == "completed":
+                self._local_put(key, doc["request_hash"], doc["response"])
+                return doc["request_hash"], doc["response"]
+
+            # Take over a stale claim left behind by a crashed request
+            stale = await self.collection.find_one_and_update(
+                {
+                    "_id": key,
+                    "status": "in_progress",
+                    "created_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}
+                },
+                {"$set": {"request_hash": request_hash, "created_at": now}}
+            )
+            if stale is not None:
+                return None
+            if doc:
+                self._check_same_request(request_hash, doc["request_hash"])
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "1"}
+                )
+            # Another worker is running it: wait for its response
+            if not waited:
+                self.waits += 1
+                waited = True
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+    async def _execute(self, key: str, request_hash: str, func) -> Tuple[str, dict, bool]:
+        """(request_hash, response, replayed) for the first caller of a key in this process"""
+        stored = await self._claim(key, request_hash)
+        if stored is not None:
+            return stored[0], stored[1], True
+
+        try:
+            response = await func()
+        except BaseException:
+            # Release the claim so the client can retry after a failure
+            await self.collection.delete_one({"_id": key, "status": "in_progress"})
+            raise
+
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"status": "completed", "response": response}}
+        )
+        self._local_put(key, request_hash, response)
+        return request_hash, response, False
+
+    async def run(self, key: Optional[str], request_hash: str, func):
+        """Run `func()` at most once per key and return its (stored) response"""
+        if not key:
+            return await func()
+
+        local = self._local_get(key)
+        if local is not None:
+            return self._replay(request_hash, local[1], local[2])
+
+        # Retries arriving while this process still runs the key join that call
+        (stored_hash, response, replayed), shared = await self._flights.do(
+            key, self._execute, key, request_hash, func
+        )
+        if shared or replayed:
+            return self._replay(request_hash, stored_hash, response)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "replays": self.replays,
+            "waits": self.waits,
+            "in_flight": self._flights.stats()["in_flight"],
+            "entries_in_memory": len(self._local)
+        }
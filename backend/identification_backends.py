@@ -0,0 +1,235 @@
+"""
+Backends that turn (image, prompt) into model text for PlantIdentifier.
+A backend has a `name`, `start()`/`close()`, `complete(image_base64, prompt)`
+returning the full response text, `stream(image_base64, prompt)` yielding it
+in chunks, and `health()`. Scheduling, retries, hedging and the circuit
+breaker live in PlantIdentifier and apply to every backend.
+
+IDENTIFY_BACKEND=llm (default) calls the vision model through
+emergentintegrations; IDENTIFY_BACKEND=simulated answers locally with
+catalogue plants, so the whole pipeline can be load-tested offline.
+"""
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+import asyncio
+import hashlib
+import json
+import os
+import random
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "llm" or "simulated"
+IDENTIFY_BACKEND = os.getenv("IDENTIFY_BACKEND", "llm")
+
+EMERGENT_LLM_KEY = os.getenv("EMERGENT_LLM_KEY", "")
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+
+# Simulated backend: lognormal latency around the median, plus a slow tail
+SIMULATED_LATENCY_MS = float(os.getenv("SIMULATED_LATENCY_MS", "1500"))
+SIMULATED_LATENCY_SIGMA = float(os.getenv("SIMULATED_LATENCY_SIGMA", "0.3"))
+SIMULATED_SLOW_RATE = float(os.getenv("SIMULATED_SLOW_RATE", "0.02"))
+SIMULATED_SLOW_MS = float(os.getenv("SIMULATED_SLOW_MS", "15000"))
+SIMULATED_ERROR_RATE = float(os.getenv("SIMULATED_ERROR_RATE", "0.0"))
+# Streamed responses are split into this many chunks spread over the latency
+SIMULATED_STREAM_CHUNKS = int(os.getenv("SIMULATED_STREAM_CHUNKS", "8"))
+SIMULATED_SEED = int(os.getenv("SIMULATED_SEED", "0"))
+
+SYSTEM_MESSAGE = "You are an expert botanist specializing in Ayurvedic plants. When shown a plant image, identify it and provide detailed information including: plant name, scientific name, family, characteristics, medicinal properties, and uses. Always respond in JSON format."
+
+
+class IdentificationBackend(ABC):
+    name = "base"
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def complete(self, image_base64: str, prompt: str) -> str:
+        """The model's full response text"""
+
+    async def stream(self, image_base64: str, prompt: str) -> AsyncIterator[str]:
+        """Backends without native streaming yield the whole response as one chunk"""
+        yield await self.complete(image_base64, prompt)
+
+    async def health(self) -> dict:
+        return {"backend": self.name, "ok": True}
+
+
+class LlmBackend(IdentificationBackend):
+    """Vision model through emergentintegrations' LlmChat"""
+    name = "llm"
+
+    def __init__(
+        self,
+        api_key: str = EMERGENT_LLM_KEY,
+        provider: str = LLM_PROVIDER,
+        model: str = LLM_MODEL,
+        pool_size: int = 20,
+        timeout: float = 20
+    ):
+        # Imported here so the simulated backend runs without the package
+        from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
+        self._chat_class, self._message_class, self._image_class = LlmChat, UserMessage, ImageContent
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._http_client = None
+
+    async def start(self):
+        """Share one keep-alive HTTP connection pool across all LLM calls"""
+        try:
+            import httpx
+            import litellm
+        except ImportError:
+            return
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            ),
+            timeout=self.timeout
+        )
+        litellm.aclient_session = self._http_client
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def _new_chat(self):
+        # A unique session per call: chats accumulate message history
+        return self._chat_class(
+            api_key=self.api_key,
+            session_id=f"plant_identification-{uuid.uuid4().hex}",
+            system_message=SYSTEM_MESSAGE
+        ).with_model(self.provider, self.model)
+
+    async def complete(self, image_base64: str, prompt: str) -> str:
+        user_message = self._message_class(
+            text=prompt,
+            file_contents=[self._image_class(image_base64=image_base64)]
+        )
+        return await self._new_chat().send_message(user_message)
+
+    async def health(self) -> dict:
+        return {
+            "backend": self.name,
+            "ok": bool(self.api_key),
+            "provider": self.provider,
+            "model": self.model
+        }
+
+
+class SimulatedUpstreamError(Exception):
+    """Injected failure; a 503 so it is retried and counted by the circuit breaker"""
+    status_code = 503
+
+
+class SimulatedBackend(IdentificationBackend):
+    """
+    Deterministic stand-in: the same image always names the same catalogue
+    plant. Latency, errors and streaming follow the SIMULATED_* settings.
+    Registered with the catalogue so it answers with real plants.
+    """
+    name = "simulated"
+    fields = ("name", "scientific_name", "family", "description", "characteristics",
+              "medicinal_properties", "uses", "parts_used")
+
+    def __init__(
+        self,
+        latency_ms: float = SIMULATED_LATENCY_MS,
+        latency_sigma: float = SIMULATED_LATENCY_SIGMA,
+        slow_rate: float = SIMULATED_SLOW_RATE,
+        slow_ms: float = SIMULATED_SLOW_MS,
+        error_rate: float = SIMULATED_ERROR_RATE,
+        stream_chunks: int = SIMULATED_STREAM_CHUNKS,
+        seed: int = SIMULATED_SEED
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self._random = random.Random(seed)
+        self._plants: List[dict] = []
+        self.calls = 0
+        self.errors = 0
+
+    def rebuild(self, plants: List[dict]):
+        self._plants = sorted(plants, key=lambda plant: str(plant["_id"]))
+
+    def add(self, plant: dict):
+        self._plants = [p for p in self._plants if str(p["_id"]) != str(plant["_id"])]
+        self._plants.append(plant)
+        self._plants.sort(key=lambda p: str(p["_id"]))
+
+    def _response(self, image_base64: str) -> str:
+        if not self._plants:
+            plant = {"name": "Unknown Plant", "scientific_name": "N/A", "family": "N/A"}
+        else:
+            digest = hashlib.sha256(image_base64.encode()).digest()
+            plant = self._plants[int.from_bytes(digest[:8], "big") % len(self._plants)]
+        return json.dumps({
+            "plant_name": plant.get("name"),
+            "scientific_name": plant.get("scientific_name"),
+            "family": plant.get("family"),
+            "confidence": "high" if self._plants else "low",
+            "characteristics": plant.get("characteristics", []),
+            "medicinal_properties": plant.get("medicinal_properties", []),
+            "uses": plant.get("uses", []),
+            "parts_used": plant.get("parts_used", []),
+            "description": plant.get("description", "")
+        })
+
+    def _latency(self) -> float:
+        if self._random.random() < self.slow_rate:
+            return self.slow_ms / 1000
+        return self.latency_ms / 1000 * self._random.lognormvariate(0, self.latency_sigma)
+
+    async def complete(self, image_base64: str, prompt: str) -> str:
+        latency = self._latency()
+        failing = self._random.random() < self.error_rate
+        await asyncio.sleep(latency if not failing else latency / 2)
+        self.calls += 1
+        if failing:
+            self.errors += 1
+            raise SimulatedUpstreamError("Simulated upstream failure")
+        return self._response(image_base64)
+
+    async def stream(self, image_base64: str, prompt: str) -> AsyncIterator[str]:
+        latency = self._latency()
+        failing = self._random.random() < self.error_rate
+        self.calls += 1
+        text = self._response(image_base64)
+        size = -(-len(text) // self.stream_chunks)
+        for start in range(0, len(text), size):
+            await asyncio.sleep(latency / self.stream_chunks)
+            if failing and start >= len(text) // 2:
+                self.errors += 1
+                raise SimulatedUpstreamError("Simulated upstream failure mid-stream")
+            yield text[start:start + size]
+
+    async def health(self) -> dict:
+        return {
+            "backend": self.name,
+            "ok": True,
+            "plants": len(self._plants),
+            "calls": self.calls,
+            "errors": self.errors
+        }
+
+
+def create_backend(pool_size: int, timeout: float) -> IdentificationBackend:
+    if IDENTIFY_BACKEND == "simulated":
+        return SimulatedBackend()
+    return LlmBackend(pool_size=pool_size, timeout=timeout)
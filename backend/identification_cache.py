@@ -0,0 +1,180 @@
+"""
+Perceptual-hash cache for plant identification results.
+Near-duplicate photos (re-scans, catalogue photos) hash to nearby 64-bit pHash
+values, so a result is reused when the Hamming distance is within a threshold.
+An in-process LRU sits in front of a Mongo collection with a TTL index; both
+stop serving an entry once it is IDENTIFY_CACHE_TTL_SECONDS old.
+"""
+from PIL import Image, ImageOps, UnidentifiedImageError
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+import io
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IDENTIFY_CACHE_MAX_DISTANCE = int(os.getenv("IDENTIFY_CACHE_MAX_DISTANCE", "6"))
+IDENTIFY_CACHE_TTL_SECONDS = int(os.getenv("IDENTIFY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+IDENTIFY_CACHE_LRU_SIZE = int(os.getenv("IDENTIFY_CACHE_LRU_SIZE", "10000"))
+
+# The 64-bit hash is split into 8 one-byte bands; by pigeonhole any hash within
+# distance d <= 7 shares at least 8 - d bands, so Mongo can find candidates by
+# index. Candidates are ranked by shared bands before the cap, so a neighbour
+# within distance 6 (2+ shared bands) is never crowded out by the one-band
+# collisions of a popular band. Lookups beyond distance 7 are best-effort.
+HASH_BANDS = 8
+MAX_MONGO_CANDIDATES = 200
+
+_DCT_SIZE = 32
+_DCT_MATRIX = np.cos(
+    np.pi * np.outer(np.arange(_DCT_SIZE), 2 * np.arange(_DCT_SIZE) + 1) / (2 * _DCT_SIZE)
+)
+
+
+def compute_phash(image_bytes: bytes) -> Optional[int]:
+    """64-bit DCT perceptual hash, or None if the image can't be decoded"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            source.draft("L", (_DCT_SIZE * 4, _DCT_SIZE * 4))
+            image = ImageOps.exif_transpose(source).convert("L")
+    except (UnidentifiedImageError, OSError):
+        return None
+    pixels = np.asarray(image.resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    dct = _DCT_MATRIX @ pixels @ _DCT_MATRIX.T
+    low = dct[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def _bands(phash: int) -> list:
+    return [f"{i}:{(phash >> (8 * i)) & 0xFF:02x}" for i in range(HASH_BANDS)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class IdentificationCache:
+    def __init__(self, collection, capacity: int = IDENTIFY_CACHE_LRU_SIZE):
+        self.collection = collection
+        self.capacity = capacity
+        # LRU order over phash -> slot; hashes live in a flat array for vectorized search
+        self._entries = OrderedDict()
+        self._results = [None] * capacity
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._expires = np.zeros(capacity, dtype=np.float64)  # unix time
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self.hits = Counter()
+        self.misses = 0
+        self.hit_distances = Counter()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=IDENTIFY_CACHE_TTL_SECONDS)
+        await self.collection.create_index("bands")
+
+    async def warm(self):
+        """Load the most recent entries into the in-process LRU"""
+        cursor = self.collection.find({"created_at": {"$gt": self._oldest_fresh()}})
+        docs = await cursor.sort("created_at", -1).limit(self.capacity).to_list(length=self.capacity)
+        # Oldest first, so the newest end up most recently used
+        for doc in reversed(docs):
+            self._remember(int(doc["_id"], 16), doc["result"], doc["created_at"])
+
+    @staticmethod
+    def _oldest_fresh() -> datetime:
+        return datetime.utcnow() - timedelta(seconds=IDENTIFY_CACHE_TTL_SECONDS)
+
+    def _remember(self, phash: int, result: dict, created_at: datetime):
+        expires = created_at.replace(tzinfo=timezone.utc).timestamp() + IDENTIFY_CACHE_TTL_SECONDS
+        if phash in self._entries:
+            self._entries.move_to_end(phash)
+            self._results[self._entries[phash]] = result
+            self._expires[self._entries[phash]] = expires
+            return
+        if not self._free_slots:
+            _, slot = self._entries.popitem(last=False)
+            self._valid[slot] = False
+            self._free_slots.append(slot)
+        slot = self._free_slots.pop()
+        self._entries[phash] = slot
+        self._results[slot] = result
+        self._hashes[slot] = phash
+        self._valid[slot] = True
+        self._expires[slot] = expires
+
+    def _lookup_local(self, phash: int, max_distance: int):
+        if not self._entries:
+            return None
+        distances = np.bitwise_count(self._hashes ^ np.uint64(phash)).astype(np.int16)
+        distances[~self._valid | (self._expires <= time.time())] = 64 + 1
+        slot = int(np.argmin(distances))
+        distance = int(distances[slot])
+        if distance > max_distance:
+            return None
+        self._entries.move_to_end(int(self._hashes[slot]))
+        return self._results[slot], distance
+
+    async def _lookup_mongo(self, phash: int, max_distance: int):
+        best = None
+        bands = _bands(phash)
+        pipeline = [
+            {"$match": {"bands": {"$in": bands}, "created_at": {"$gt": self._oldest_fresh()}}},
+            {"$addFields": {"shared_bands": {"$size": {
+                "$filter": {"input": "$bands", "cond": {"$in": ["$$this", bands]}}
+            }}}},
+            {"$sort": {"shared_bands": -1}},
+            {"$limit": MAX_MONGO_CANDIDATES},
+        ]
+        async for doc in self.collection.aggregate(pipeline):
+            distance = hamming_distance(phash, int(doc["_id"], 16))
+            if distance <= max_distance and (best is None or distance < best[1]):
+                best = (doc, distance)
+        if best is None:
+            return None
+        doc, distance = best
+        self._remember(int(doc["_id"], 16), doc["result"], doc["created_at"])
+        return doc["result"], distance
+
+    async def get(self, phash: int, max_distance: int = IDENTIFY_CACHE_MAX_DISTANCE):
+        """Return (result, distance) for the nearest cached hash, or None"""
+        found = self._lookup_local(phash, max_distance)
+        source = "memory"
+        if found is None:
+            found = await self._lookup_mongo(phash, max_distance)
+            source = "mongo"
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits[source] += 1
+        self.hit_distances[found[1]] += 1
+        return found
+
+    async def put(self, phash: int, result: dict):
+        created_at = datetime.utcnow()
+        self._remember(phash, result, created_at)
+        try:
+            await self.collection.insert_one({
+                "_id": f"{phash:016x}",
+                "bands": _bands(phash),
+                "result": result,
+                "created_at": created_at
+            })
+        except DuplicateKeyError:
+            pass
+
+    def stats(self) -> dict:
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(sum(self.hits.values()) / lookups, 4) if lookups else 0.0,
+            "hit_distances": {str(d): n for d, n in sorted(self.hit_distances.items())},
+            "entries_in_memory": len(self._entries),
+            "max_distance": IDENTIFY_CACHE_MAX_DISTANCE
+        }
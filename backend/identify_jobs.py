@@ -0,0 +1,186 @@
+"""
+Mongo-backed identification job queue.
+POST /api/identify/jobs enqueues a job and returns immediately; a pool of
+async workers (in every uvicorn worker process) claims jobs atomically and
+runs the identification. Clients poll or long-poll the job for its result.
+The uploaded image is kept on the job document until the job finishes, so
+nothing outlives the job (the scan saved by the handler stores its own copy).
+"""
+from fastapi import HTTPException
+from bson import ObjectId
+from bson.binary import Binary
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from typing import Optional
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+from metrics import LatencyTracker
+from image_store import load_image
+from uploads import MAX_UPLOAD_BYTES
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IDENTIFY_WORKERS = int(os.getenv("IDENTIFY_WORKERS", "4"))
+# Workers in other processes pick up new jobs within this interval
+IDENTIFY_JOB_POLL_SECONDS = float(os.getenv("IDENTIFY_JOB_POLL_SECONDS", "1.0"))
+# A running job whose worker died is retried after its lease expires
+IDENTIFY_JOB_LEASE_SECONDS = int(os.getenv("IDENTIFY_JOB_LEASE_SECONDS", "180"))
+IDENTIFY_JOB_MAX_ATTEMPTS = int(os.getenv("IDENTIFY_JOB_MAX_ATTEMPTS", "3"))
+IDENTIFY_JOB_RETENTION_SECONDS = int(os.getenv("IDENTIFY_JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+class IdentifyJobQueue:
+    def __init__(self, collection, handler, workers: int = IDENTIFY_WORKERS):
+        """`handler(image_bytes, user_id)` returns the identification response"""
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._finished = {}  # job_id -> Event, for long-polls in this process
+        self.wait_time = LatencyTracker()
+        self.run_time = LatencyTracker()
+        self.completed = 0
+        self.failed = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+        await self.collection.create_index("expire_at", expireAfterSeconds=0)
+
+    def start(self):
+        for n in range(self.workers):
+            self._tasks.append(asyncio.ensure_future(self._work(n)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, image_bytes: bytes, user_id: str) -> str:
+        # Well under Mongo's 16MB document limit
+        if len(image_bytes) > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)}MB limit"
+            )
+        result = await self.collection.insert_one({
+            "user_id": user_id,
+            "image": Binary(image_bytes),
+            "status": "queued",
+            "attempts": 0,
+            "created_at": datetime.utcnow()
+        })
+        self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def _claim(self, worker: int) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": f"{os.getpid()}-{worker}",
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=IDENTIFY_JOB_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _work(self, worker: int):
+        while True:
+            try:
+                job = await self._claim(worker)
+            except Exception:
+                logger.exception("Failed to claim identify job")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDENTIFY_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        self.wait_time.observe((job["started_at"] - job["created_at"]).total_seconds())
+        update = {}
+        try:
+            if job["attempts"] > IDENTIFY_JOB_MAX_ATTEMPTS:
+                raise HTTPException(status_code=500, detail="Job exceeded retry attempts")
+            image_bytes = job.get("image")
+            if image_bytes is None and job.get("image_hash"):
+                # Jobs queued before images were kept on the job document
+                image_bytes = await load_image(job["image_hash"])
+            if image_bytes is None:
+                raise HTTPException(status_code=500, detail="Job image is missing")
+            update["result"] = await self.handler(image_bytes, job["user_id"])
+            update["status"] = "done"
+            self.completed += 1
+        except HTTPException as e:
+            update.update(status="failed", error=e.detail, status_code=e.status_code)
+            self.failed += 1
+        except Exception as e:
+            logger.exception("Identify job %s failed", job["_id"])
+            update.update(status="failed", error=str(e), status_code=500)
+            self.failed += 1
+
+        finished_at = datetime.utcnow()
+        update["finished_at"] = finished_at
+        update["expire_at"] = finished_at + timedelta(seconds=IDENTIFY_JOB_RETENTION_SECONDS)
+        self.run_time.observe((finished_at - job["started_at"]).total_seconds())
+        await self.collection.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"image": ""}})
+
+        event = self._finished.get(str(job["_id"]))
+        if event is not None:
+            event.set()
+
+    async def get(self, job_id: str, user_id: str, wait: float = 0) -> Optional[dict]:
+        """Fetch a job, long-polling up to `wait` seconds for it to finish"""
+        if not ObjectId.is_valid(job_id):
+            return None
+        query = {"_id": ObjectId(job_id), "user_id": user_id}
+        projection = {"image": 0}
+        deadline = asyncio.get_running_loop().time() + wait
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            while True:
+                job = await self.collection.find_one(query, projection)
+                remaining = deadline - asyncio.get_running_loop().time()
+                if job is None or job["status"] in FINISHED_STATUSES or remaining <= 0:
+                    return job
+                # Woken instantly by a local worker, otherwise re-check periodically
+                try:
+                    await asyncio.wait_for(
+                        event.wait(), min(remaining, IDENTIFY_JOB_POLL_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._finished.get(job_id) is event:
+                del self._finished[job_id]
+
+    async def stats(self) -> dict:
+        return {
+            "queue_depth": await self.collection.count_documents({"status": "queued"}),
+            "running": await self.collection.count_documents({"status": "running"}),
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_time": self.wait_time.snapshot(),
+            "run_time": self.run_time.snapshot()
+        }
@@ -0,0 +1,99 @@
+"""
+Pillow-based derivative pipeline for plant and scan images.
+Every stored image gets fixed-size thumbnail/medium/full variants so list and
+history views never have to ship the original camera upload.
+"""
+from PIL import Image, ImageOps, UnidentifiedImageError
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import binascii
+import io
+import os
+import time
+
+# JPEG or WEBP
+IMAGE_VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT", "JPEG").upper()
+
+# Longest edge in pixels, largest first so each variant is resized from the
+# previous one instead of from the original
+VARIANT_SIZES = {"full": 1600, "medium": 800, "thumbnail": 200}
+VARIANT_QUALITY = {"full": 85, "medium": 80, "thumbnail": 70}
+
+# Images sent to the vision model are downscaled to this longest edge
+IDENTIFY_MAX_EDGE = int(os.getenv("IDENTIFY_MAX_EDGE", "1024"))
+IDENTIFY_JPEG_QUALITY = int(os.getenv("IDENTIFY_JPEG_QUALITY", "85"))
+
+# Pillow releases the GIL while decoding/resizing, so threads scale here
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+
+class ImageProcessingError(ValueError):
+    pass
+
+
+def decode_base64_image(image_base64: str) -> bytes:
+    """Decode a base64 image, accepting an optional data: URI prefix"""
+    if image_base64.startswith("data:"):
+        image_base64 = image_base64.split(",", 1)[-1]
+    try:
+        return base64.b64decode(image_base64, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ImageProcessingError(f"Invalid base64 image: {e}")
+
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=IMAGE_VARIANT_FORMAT, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _open_oriented(image_bytes: bytes, max_edge: int = None) -> Image.Image:
+    """Decode to an upright RGB image; JPEGs are decoded at reduced scale when possible"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            if max_edge:
+                source.draft("RGB", (max_edge, max_edge))
+            return ImageOps.exif_transpose(source).convert("RGB")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageProcessingError(f"Unreadable image: {e}")
+
+
+def make_variants(image_bytes: bytes) -> dict:
+    """Return {"full": bytes, "medium": bytes, "thumbnail": bytes}"""
+    image = _open_oriented(image_bytes)
+
+    variants = {}
+    for name, max_edge in VARIANT_SIZES.items():
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        variants[name] = _encode(image, VARIANT_QUALITY[name])
+    return variants
+
+
+def normalize_for_identification(image_bytes: bytes) -> tuple:
+    """
+    EXIF-orient, strip metadata, downscale and re-encode an image for the
+    vision model. Returns (jpeg_bytes, stats).
+    """
+    started = time.perf_counter()
+    image = _open_oriented(image_bytes, IDENTIFY_MAX_EDGE)
+    image.thumbnail((IDENTIFY_MAX_EDGE, IDENTIFY_MAX_EDGE), Image.LANCZOS)
+    buffer = io.BytesIO()
+    # Saving a fresh RGB image writes no EXIF/ICC metadata
+    image.save(buffer, format="JPEG", quality=IDENTIFY_JPEG_QUALITY, optimize=True)
+    normalized = buffer.getvalue()
+    stats = {
+        "bytes_in": len(image_bytes),
+        "bytes_out": len(normalized),
+        "width": image.width,
+        "height": image.height,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+    return normalized, stats
+
+
+async def run_in_image_pool(func, *args):
+    """Run a CPU-bound image function on the shared image worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(image_executor, func, *args)
@@ -0,0 +1,165 @@
+"""
+Content-addressed binary image store.
+Images are stored once as raw bytes keyed by their SHA-256 hex digest; plant
+and scan documents only hold these hashes, and /api/images/{hash} serves them.
+"""
+from pymongo.errors import DuplicateKeyError
+from bson.binary import Binary
+from typing import AsyncIterator, Optional
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from dotenv import load_dotenv
+from image_pipeline import ImageProcessingError, make_variants, run_in_image_pool
+
+load_dotenv()
+
+# "mongo" keeps blobs in the images collection, "filesystem" under IMAGE_STORE_PATH
+IMAGE_STORE_BACKEND = os.getenv("IMAGE_STORE_BACKEND", "mongo")
+IMAGE_STORE_PATH = os.getenv("IMAGE_STORE_PATH", "image_store")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+IMAGE_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def hash_image(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    return "application/octet-stream"
+
+
+def image_url(image_hash: Optional[str]) -> Optional[str]:
+    return f"/api/images/{image_hash}" if image_hash else None
+
+
+class MongoImageStore:
+    """One document per image, `_id` is the hash (images are well under 16MB)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def put(self, data: bytes) -> str:
+        image_hash = hash_image(data)
+        try:
+            await self.collection.insert_one({
+                "_id": image_hash,
+                "data": Binary(data),
+                "size": len(data),
+                "content_type": sniff_content_type(data)
+            })
+        except DuplicateKeyError:
+            pass  # Already stored, identical content
+        return image_hash
+
+    async def stat(self, image_hash: str) -> Optional[dict]:
+        return await self.collection.find_one(
+            {"_id": image_hash}, {"size": 1, "content_type": 1}
+        )
+
+    async def stream(self, image_hash: str, start: int, end: int) -> AsyncIterator[bytes]:
+        doc = await self.collection.find_one({"_id": image_hash}, {"data": 1})
+        data = memoryview(doc["data"])[start:end + 1]
+        for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+            yield bytes(data[offset:offset + STREAM_CHUNK_SIZE])
+
+
+class FileSystemImageStore:
+    """Files sharded as <root>/ab/cd/<hash>, written atomically"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, image_hash: str) -> str:
+        return os.path.join(self.root, image_hash[:2], image_hash[2:4], image_hash)
+
+    def _write(self, image_hash: str, data: bytes):
+        path = self._path(image_hash)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _stat(self, image_hash: str) -> Optional[dict]:
+        path = self._path(image_hash)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            head = f.read(16)
+        return {"size": os.path.getsize(path), "content_type": sniff_content_type(head)}
+
+    def _read(self, image_hash: str, offset: int, length: int) -> bytes:
+        with open(self._path(image_hash), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    async def put(self, data: bytes) -> str:
+        image_hash = hash_image(data)
+        await asyncio.to_thread(self._write, image_hash, data)
+        return image_hash
+
+    async def stat(self, image_hash: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._stat, image_hash)
+
+    async def stream(self, image_hash: str, start: int, end: int) -> AsyncIterator[bytes]:
+        offset = start
+        while offset <= end:
+            length = min(STREAM_CHUNK_SIZE, end - offset + 1)
+            chunk = await asyncio.to_thread(self._read, image_hash, offset, length)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+
+def create_image_store():
+    if IMAGE_STORE_BACKEND == "filesystem":
+        return FileSystemImageStore(IMAGE_STORE_PATH)
+    import database
+    return MongoImageStore(database.db.images)
+
+
+image_store = create_image_store()
+
+
+async def store_image(image_bytes: bytes, variants_required: bool = True) -> dict:
+    """
+    Store the original image and its derivatives.
+    Returns {"original": hash, "full": hash, "medium": hash, "thumbnail": hash}.
+    With `variants_required=False`, an image Pillow can't decode is still
+    stored as its original bytes and only {"original": hash} is returned.
+    """
+    try:
+        variants = await run_in_image_pool(make_variants, image_bytes)
+    except ImageProcessingError:
+        if variants_required:
+            raise
+        variants = {}
+    variants["original"] = image_bytes
+    names = list(variants)
+    hashes = await asyncio.gather(*[image_store.put(variants[name]) for name in names])
+    return dict(zip(names, hashes))
+
+
+async def load_image(image_hash: str) -> Optional[bytes]:
+    info = await image_store.stat(image_hash)
+    if not info:
+        return None
+    chunks = [chunk async for chunk in image_store.stream(image_hash, 0, info["size"] - 1)]
+    return b"".join(chunks)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Move inline base64 images on plants and scans into the content-addressed
+image store, generating thumbnail/medium/full variants on the way
+"""
+import asyncio
+from image_pipeline import decode_base64_image, ImageProcessingError
+from image_store import store_image
+import database
+
+
+async def migrate_plants():
+    updated = 0
+    async for plant in database.db.plants.find(
+        {"images_base64": {"$exists": True}},
+        {"name": 1, "images_base64": 1}
+    ):
+        label = plant.get("name", plant["_id"])
+        try:
+            images = [
+                await store_image(decode_base64_image(image))
+                for image in plant["images_base64"]
+            ]
+        except ImageProcessingError as e:
+            print(f"  ❌ {label}: {e}")
+            continue
+        await database.db.plants.update_one(
+            {"_id": plant["_id"]},
+            {
+                "$set": {"images": images},
+                "$unset": {"images_base64": "", "image_variants": "", "thumbnail": ""}
+            }
+        )
+        updated += 1
+        print(f"  ✅ {label} ({len(images)} images)")
+    return updated
+
+
+async def migrate_scans():
+    updated = 0
+    async for scan in database.db.scans.find(
+        {"scanned_image_base64": {"$exists": True}},
+        {"scanned_image_base64": 1}
+    ):
+        try:
+            image_bytes = decode_base64_image(scan["scanned_image_base64"])
+        except ImageProcessingError as e:
+            # Left inline rather than dropped; nothing else references it
+            print(f"  ❌ scan {scan['_id']}: {e}")
+            continue
+        # Undecodable images still keep their original bytes
+        scanned_image = await store_image(image_bytes, variants_required=False)
+        await database.db.scans.update_one(
+            {"_id": scan["_id"]},
+            {
+                "$set": {"scanned_image": scanned_image},
+                "$unset": {"scanned_image_base64": "", "scanned_image_thumbnail": ""}
+            }
+        )
+        updated += 1
+    return updated
+
+
+async def main():
+    print("Migrating plant images...")
+    plants_updated = await migrate_plants()
+    print("Migrating scan images...")
+    scans_updated = await migrate_scans()
+    print(f"\n✅ Migrated {plants_updated} plants and {scans_updated} scans")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
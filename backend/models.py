@@ -103,7 +103,7 @@ class Plant(BaseModel):
     # References
     references: List[dict] = []  # [{"text": "text", "verse": "verse", "source": "source"}]
     
-    images_base64: List[str]
+    images: List[dict] = []  # [{"original": sha256, "full": sha256, "medium": sha256, "thumbnail": sha256}]
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
@@ -125,7 +125,7 @@ class PlantCreate(BaseModel):
 class ScanHistory(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     user_id: str
-    scanned_image_base64: str
+    scanned_image: Optional[dict] = None  # image store hashes, same shape as Plant.images
     identified_plant_name: str
     confidence: str
     ai_response: str
@@ -139,6 +139,10 @@ class ScanHistory(BaseModel):
 class IdentifyPlantRequest(BaseModel):
     image_base64: str
 
+class IdentifyBatchRequest(BaseModel):
+    # Several photos (leaf, flower, bark...) of the same specimen
+    images_base64: List[str] = Field(..., min_length=1, max_length=10)
+
 class IdentifyPlantResponse(BaseModel):
     plant_name: str
     scientific_name: Optional[str]
@@ -0,0 +1,260 @@
+"""
+In-memory lookup of catalogue plants by any of their names.
+Common, scientific, synonym, Sanskrit and vernacular names are normalized
+(casefolded, diacritics stripped, botanical author abbreviations removed) into
+one key -> plant map, so matching a model's identification is a dict lookup,
+with a bounded edit-distance search as the fallback for near misses.
+Names are also keyed phonetically across scripts (see transliteration), so
+"Haridra" finds a plant listed only as "हरिद्रा".
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import unicodedata
+from dotenv import load_dotenv
+from transliteration import phonetic_keys
+
+load_dotenv()
+
+# Max edit distance for fuzzy matches, by key length
+NAME_MATCH_MAX_DISTANCE = int(os.getenv("NAME_MATCH_MAX_DISTANCE", "2"))
+NAME_MATCH_MIN_FUZZY_LENGTH = 5
+
+# Preferred field when one key names several plants
+FIELD_PRIORITY = (
+    "scientific_name", "botanical_synonyms", "name", "sanskrit_name", "synonyms", "vernacular_names",
+    "search_keys"
+)
+# Fields whose names get phonetic, script-independent search keys
+SEARCH_KEY_FIELDS = {"name", "sanskrit_name", "synonyms", "vernacular_names"}
+
+INFRASPECIFIC_RANKS = {"var.": "var", "subsp.": "subsp", "ssp.": "subsp", "f.": "f", "cv.": "cv"}
+AUTHOR_PARTICLES = {"ex", "et", "al", "al.", "and", "&", "de", "van", "von", "in"}
+PARENTHETICAL = re.compile(r"\(([^)]*)\)")
+LIST_SEPARATORS = re.compile(r"[,;/]")
+
+
+def strip_diacritics(text: str) -> str:
+    # Only Latin combining marks: Indic vowel signs are combining characters too
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not "\u0300" <= c <= "\u036f")
+    return unicodedata.normalize("NFC", stripped)
+
+
+def normalize_name(text: str) -> str:
+    """Casefolded, diacritic- and punctuation-free, single-spaced"""
+    text = strip_diacritics(text).casefold()
+    text = "".join(
+        " " if unicodedata.category(c)[0] in "PSZ" else c for c in text
+    )
+    return " ".join(text.split())
+
+
+def scientific_key(text: str) -> str:
+    """
+    Normalized binomial (plus infraspecific rank) without authors:
+    "Withania somnifera (L.) Dunal" -> "withania somnifera",
+    "Brassica oleracea L. var. botrytis" -> "brassica oleracea var botrytis".
+    """
+    tokens = PARENTHETICAL.sub(" ", text).replace("×", " ").split()
+    if not tokens:
+        return ""
+    kept = [tokens[0]]
+    rest = tokens[1:]
+    if rest and rest[0][:1].islower() and rest[0].isalpha() and rest[0] not in AUTHOR_PARTICLES:
+        kept.append(rest.pop(0))
+        for rank, epithet in zip(rest, rest[1:]):
+            if rank in INFRASPECIFIC_RANKS and epithet[:1].islower() and epithet.isalpha():
+                kept += [INFRASPECIFIC_RANKS[rank], epithet]
+    return normalize_name(" ".join(kept))
+
+
+def binomial_key(text: str) -> str:
+    return " ".join(scientific_key(text).split()[:2])
+
+
+def name_keys(text: str) -> List[str]:
+    """
+    Keys for a display name, e.g. "हरिद्रा (Haridra)" or "Tulsi, Tulasi":
+    each listed name, with and without its parenthetical
+    """
+    keys = []
+    for part in LIST_SEPARATORS.split(text):
+        for variant in [PARENTHETICAL.sub(" ", part), *PARENTHETICAL.findall(part)]:
+            key = normalize_name(variant)
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Levenshtein distance, or None as soon as it must exceed `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def max_distance(key: str) -> int:
+    if len(key) < NAME_MATCH_MIN_FUZZY_LENGTH:
+        return 0
+    return min(NAME_MATCH_MAX_DISTANCE, 1 if len(key) <= 8 else 2)
+
+
+def plant_keys(plant: dict) -> Iterable[Tuple[str, str]]:
+    """(key, field) pairs for every name a plant is known by"""
+    for key in name_keys(plant.get("name") or ""):
+        yield key, "name"
+    scientific_name = plant.get("scientific_name")
+    if scientific_name:
+        yield scientific_key(scientific_name), "scientific_name"
+    for synonym in plant.get("botanical_synonyms") or []:
+        yield scientific_key(synonym), "botanical_synonyms"
+    for key in name_keys(plant.get("sanskrit_name") or ""):
+        yield key, "sanskrit_name"
+    for synonym in plant.get("synonyms") or []:
+        for key in name_keys(synonym.get("name", "") if isinstance(synonym, dict) else str(synonym)):
+            yield key, "synonyms"
+    vernacular_names = plant.get("vernacular_names") or {}
+    for name in vernacular_names.values():
+        for key in name_keys(name if isinstance(name, str) else " / ".join(name)):
+            yield key, "vernacular_names"
+
+
+def plant_search_keys(plant: dict) -> List[str]:
+    """Phonetic keys of a plant's names, stored on the document as `search_keys`"""
+    keys = set()
+    for key, field in plant_keys(plant):
+        if field in SEARCH_KEY_FIELDS:
+            keys.update(phonetic_keys(key))
+    return sorted(keys)
+
+
+def search_keys(plant: dict) -> List[str]:
+    """The document's precomputed search keys, computed for documents written without them"""
+    return plant.get("search_keys") or plant_search_keys(plant)
+
+
+class NameIndex:
+    fields = (
+        "name", "scientific_name", "botanical_synonyms", "sanskrit_name", "synonyms", "vernacular_names",
+        "search_keys"
+    )
+
+    def __init__(self):
+        self._keys: Dict[str, Dict[str, str]] = {}  # key -> {plant_id: field}
+        self._by_length: Dict[int, set] = {}
+        self._plant_keys: Dict[str, List[str]] = {}
+        self.exact_matches = 0
+        self.fuzzy_matches = 0
+        self.misses = 0
+
+    def rebuild(self, plants: List[dict]):
+        index = NameIndex()
+        for plant in plants:
+            index.add(plant)
+        self._keys, self._by_length, self._plant_keys = index._keys, index._by_length, index._plant_keys
+
+    def add(self, plant: dict):
+        plant_id = str(plant["_id"])
+        self.remove(plant_id)
+        keys = []
+        all_keys = list(plant_keys(plant)) + [(key, "search_keys") for key in search_keys(plant)]
+        for key, field in all_keys:
+            if not key:
+                continue
+            owners = self._keys.setdefault(key, {})
+            if plant_id not in owners or FIELD_PRIORITY.index(field) < FIELD_PRIORITY.index(owners[plant_id]):
+                owners[plant_id] = field
+            self._by_length.setdefault(len(key), set()).add(key)
+            keys.append(key)
+        self._plant_keys[plant_id] = keys
+
+    def remove(self, plant_id: str):
+        for key in self._plant_keys.pop(plant_id, []):
+            owners = self._keys.get(key)
+            if owners is None:
+                continue
+            owners.pop(plant_id, None)
+            if not owners:
+                del self._keys[key]
+                self._by_length[len(key)].discard(key)
+
+    def _best_owner(self, key: str) -> Tuple[str, str]:
+        return min(self._keys[key].items(), key=lambda owner: FIELD_PRIORITY.index(owner[1]))
+
+    def _fuzzy(self, query: str) -> Optional[Tuple[str, int]]:
+        limit = max_distance(query)
+        if limit == 0:
+            return None
+        best = None
+        for length in range(len(query) - limit, len(query) + limit + 1):
+            for key in self._by_length.get(length, ()):
+                distance = bounded_edit_distance(query, key, limit)
+                if distance is not None and (best is None or distance < best[1]):
+                    best = (key, distance)
+                    limit = distance
+        return best
+
+    def _queries(self, plant_data: dict) -> List[Tuple[str, str]]:
+        """Normalized lookups for an identification, most specific first"""
+        queries = []
+        scientific_name = plant_data.get("scientific_name")
+        if isinstance(scientific_name, str) and scientific_name.strip():
+            queries.append((scientific_key(scientific_name), "scientific_name"))
+            queries.append((binomial_key(scientific_name), "scientific_name"))
+        for source in ("plant_name", "sanskrit_name"):
+            value = plant_data.get(source)
+            if isinstance(value, str):
+                queries.extend((key, source) for key in name_keys(value))
+        # Spelling and script variants only after every name as given
+        queries.extend(
+            (phonetic, source) for key, source in list(queries)
+            if source != "scientific_name" for phonetic in phonetic_keys(key)
+        )
+        seen = set()
+        return [q for q in queries if q[0] and q[0] not in seen and not seen.add(q[0])]
+
+    def match(self, plant_data: dict) -> Optional[Tuple[str, dict]]:
+        """(plant_id, match_reason) for the catalogue plant an identification names"""
+        queries = self._queries(plant_data)
+        for query, source in queries:
+            if query in self._keys:
+                plant_id, field = self._best_owner(query)
+                self.exact_matches += 1
+                return plant_id, {
+                    "method": "exact", "query_field": source, "matched_field": field,
+                    "matched_name": query, "distance": 0
+                }
+        for query, source in queries:
+            found = self._fuzzy(query)
+            if found:
+                key, distance = found
+                plant_id, field = self._best_owner(key)
+                self.fuzzy_matches += 1
+                return plant_id, {
+                    "method": "fuzzy", "query_field": source, "matched_field": field,
+                    "matched_name": key, "distance": distance
+                }
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "plants": len(self._plant_keys),
+            "keys": len(self._keys),
+            "exact_matches": self.exact_matches,
+            "fuzzy_matches": self.fuzzy_matches,
+            "misses": self.misses
+        }
@@ -0,0 +1,29 @@
+"""
+Opaque cursors for keyset pagination.
+A cursor is the sort position of the last item of a page, serialized as
+URL-safe base64 JSON. The next page is then an index range scan starting
+after that position, so page 1000 costs the same as page one, unlike skip.
+"""
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position: dict) -> str:
+    data = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(data)
+    except (binascii.Error, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(position, dict):
+        raise InvalidCursor("Invalid cursor")
+    return position
@@ -1,30 +1,38 @@
 import os
+import asyncio
+import time
 from dotenv import load_dotenv
-from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
-import json
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from typing import AsyncIterator, Optional
+from streaming_json import IncrementalJSONObjectParser
+from scheduler import PriorityScheduler, QueueFull
+from metrics import LatencyTracker
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from identification_backends import IdentificationBackend, create_backend
 
 load_dotenv()
 
-EMERGENT_LLM_KEY = os.getenv("EMERGENT_LLM_KEY", "")
+# Max concurrent upstream calls / pooled HTTP connections; more calls queue by priority
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+# Deadline for one identification call, including retries and hedges. It
+# starts once the call first holds a model slot, so time spent queued behind
+# higher-priority calls (a batch or job under load) doesn't use it up
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "45"))
+# Timeout of a single upstream attempt
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "20"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+# A duplicate attempt starts once the first is slower than this percentile of
+# recent attempts, so only the slowest few percent of calls cost double
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
 
-async def identify_plant_from_image(image_base64: str) -> dict:
-    """
-    Identify a plant from base64 image using OpenAI Vision API
-    """
-    try:
-        # Create a new LlmChat instance for this identification
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"plant_identification",
-            system_message="You are an expert botanist specializing in Ayurvedic plants. When shown a plant image, identify it and provide detailed information including: plant name, scientific name, family, characteristics, medicinal properties, and uses. Always respond in JSON format."
-        ).with_model("openai", "gpt-4o")
-
-        # Create image content from base64
-        image_content = ImageContent(image_base64=image_base64)
-
-        # Create user message with image
-        user_message = UserMessage(
-            text="""Please identify this plant and provide information in the following JSON format:
+# Upstream statuses worth another attempt
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+IDENTIFY_PROMPT = """Please identify this plant and provide information in the following JSON format:
 {
   "plant_name": "common name of the plant",
   "scientific_name": "scientific name",
@@ -37,49 +45,235 @@ async def identify_plant_from_image(image_base64: str) -> dict:
   "description": "detailed description"
 }
 
-If you cannot identify the plant with certainty, set confidence to 'low' and provide your best guess.""",
-            file_contents=[image_content]
+If you cannot identify the plant with certainty, set confidence to 'low' and provide your best guess."""
+
+# First stage: names only, so the common case costs a few dozen output tokens
+NAME_PROMPT = """Identify this plant. Reply with only this JSON object and nothing else:
+{"plant_name": "common name", "scientific_name": "genus species", "confidence": "high/medium/low"}
+If you cannot identify the plant with certainty, set confidence to 'low' and give your best guess."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures and throttling/5xx responses from the provider"""
+    if isinstance(error, (QueueFull, CircuitOpen)):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    # litellm exceptions without a status: APIConnectionError, Timeout, ...
+    return type(error).__name__ in {"APIConnectionError", "Timeout", "APITimeoutError", "ServiceUnavailableError"}
+
+
+def unparsed_identification(response: str) -> dict:
+    """Fallback when the model didn't return a JSON object"""
+    return {
+        "plant_name": "Unknown",
+        "scientific_name": "N/A",
+        "family": "N/A",
+        "confidence": "low",
+        "characteristics": [],
+        "medicinal_properties": [],
+        "uses": [],
+        "parts_used": [],
+        "description": response
+    }
+
+
+def parse_identification_response(response: str) -> dict:
+    """Extract the JSON payload from a model response"""
+    parser = IncrementalJSONObjectParser()
+    parser.feed(response)
+    return {
+        "success": True,
+        "data": parser.fields if parser.complete else unparsed_identification(response),
+        "raw_response": response
+    }
+
+
+class PlantIdentifier:
+    """
+    Long-lived identification client, created once at app startup.
+    Wraps an identification backend (see identification_backends) with
+    priority scheduling, per-call deadlines, retries, hedging and a circuit
+    breaker, and parses its output into identification results.
+    """
+
+    def __init__(
+        self,
+        backend: IdentificationBackend = None,
+        pool_size: int = LLM_POOL_SIZE,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        attempt_timeout: float = LLM_ATTEMPT_TIMEOUT_SECONDS,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        hedge: bool = LLM_HEDGE_ENABLED,
+        slow_call_seconds: float = None
+    ):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+        self.scheduler = PriorityScheduler(pool_size)
+        # Only provider-side failures (timeouts, 5xx, throttling) trip the breaker
+        self.breaker = CircuitBreaker(is_failure=is_retryable, slow_call_seconds=slow_call_seconds)
+        if self.breaker.slow_call_seconds >= attempt_timeout:
+            raise ValueError(
+                f"Slow-call threshold ({self.breaker.slow_call_seconds:g}s) must be below "
+                f"the attempt timeout ({attempt_timeout:g}s), or no call can ever count as slow"
+            )
+        self.backend = backend or create_backend(pool_size, attempt_timeout)
+        self.attempt_latency = LatencyTracker()
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    async def start(self):
+        await self.backend.start()
+
+    async def close(self):
+        await self.backend.close()
+
+    async def health(self) -> dict:
+        return {**await self.backend.health(), "circuit": self.breaker.state}
+
+    async def _send(self, image_base64: str, prompt: str = IDENTIFY_PROMPT) -> str:
+        # Fail fast instead of queueing for a slot while the circuit is open;
+        # each attempt is then admitted and recorded by the breaker in _call
+        self.breaker.check()
+        return await self._send_with_deadline(image_base64, prompt)
+
+    async def _send_with_deadline(self, image_base64: str, prompt: str) -> str:
+        # Unscheduled until the first attempt gets a slot (see _call)
+        deadline = asyncio.timeout(None)
+        try:
+            async with deadline:
+                return await self._send_with_retries(image_base64, prompt, deadline)
+        except asyncio.TimeoutError:
+            if deadline.expired():
+                self.deadline_exceeded += 1
+            raise
+
+    async def _send_with_retries(self, image_base64: str, prompt: str, deadline: asyncio.Timeout) -> str:
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=LLM_RETRY_BASE_SECONDS, max=LLM_RETRY_MAX_SECONDS),
+            retry=retry_if_exception(is_retryable),
+            reraise=True
         )
+        async for attempt in retrying:
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    self.retries += 1
+                return await self._hedged(image_base64, prompt, deadline)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or self.attempt_latency.count < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.attempt_latency.percentile(LLM_HEDGE_PERCENTILE)
 
-        # Get response
-        response = await chat.send_message(user_message)
-        
-        # Parse JSON response
+    def _has_spare_slot(self) -> bool:
+        # Hedges never take a slot a queued call is waiting for
+        scheduler = self.scheduler
+        return scheduler.active < scheduler.concurrency and not scheduler.waiting()
+
+    async def _hedged(self, image_base64: str, prompt: str, deadline: asyncio.Timeout) -> str:
+        """One attempt, plus a duplicate if it runs past the hedge delay; first success wins"""
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self.scheduler.run(self._call, image_base64, prompt, deadline)
+
+        primary = asyncio.ensure_future(self.scheduler.run(self._call, image_base64, prompt, deadline))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and self._has_spare_slot():
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(self.scheduler.run(self._call, image_base64, prompt, deadline)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, image_base64: str, prompt: str, deadline: asyncio.Timeout) -> str:
+        if deadline.when() is None:
+            deadline.reschedule(asyncio.get_running_loop().time() + self.timeout)
+        self.attempts += 1
+        started = time.perf_counter()
+        # Only time spent upstream counts for the breaker, not the queue wait
+        async with self.breaker.guard():
+            response = await asyncio.wait_for(
+                self.backend.complete(image_base64, prompt),
+                timeout=self.attempt_timeout
+            )
+        self.attempt_latency.observe(time.perf_counter() - started)
+        return response
+
+    async def stream(self, image_base64: str, prompt: str = IDENTIFY_PROMPT) -> AsyncIterator[str]:
+        """
+        Yield the model output as text chunks as the backend produces them.
+        Output can't be retried or hedged once it has started, so streams only
+        get scheduling, the circuit breaker and the overall deadline.
+        """
+        self.breaker.check()
+        async with self.scheduler.slot(), self.breaker.guard():
+            self.attempts += 1
+            async with asyncio.timeout(self.timeout):
+                async for chunk in self.backend.stream(image_base64, prompt):
+                    yield chunk
+
+    async def identify_name(self, image_base64: str) -> dict:
+        """Name, scientific name and confidence only"""
+        return await self.identify(image_base64, prompt=NAME_PROMPT)
+
+    async def identify(self, image_base64: str, prompt: str = IDENTIFY_PROMPT) -> dict:
+        """
+        Identify a plant from a base64 image with the configured backend
+        """
         try:
-            # Try to extract JSON from response
-            response_text = response.strip()
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-            
-            plant_data = json.loads(response_text)
+            return parse_identification_response(await self._send(image_base64, prompt))
+
+        except (QueueFull, CircuitOpen):
+            raise
+        except asyncio.TimeoutError:
             return {
-                "success": True,
-                "data": plant_data,
-                "raw_response": response
+                "success": False,
+                "error": f"Identification timed out after {self.timeout:g}s",
+                "data": None
             }
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return raw response
+        except Exception as e:
             return {
-                "success": True,
-                "data": {
-                    "plant_name": "Unknown",
-                    "scientific_name": "N/A",
-                    "family": "N/A",
-                    "confidence": "low",
-                    "characteristics": [],
-                    "medicinal_properties": [],
-                    "uses": [],
-                    "parts_used": [],
-                    "description": response
-                },
-                "raw_response": response
+                "success": False,
+                "error": str(e),
+                "data": None
             }
 
-    except Exception as e:
+    def stats(self) -> dict:
         return {
-            "success": False,
-            "error": str(e),
-            "data": None
-        }
\ No newline at end of file
+            "backend": self.name,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(self._hedge_delay() * 1000, 2) if self._hedge_delay() else None,
+            "deadline_exceeded": self.deadline_exceeded,
+            "attempt_latency": self.attempt_latency.snapshot()
+        }
@@ -0,0 +1,125 @@
+"""
+Priority admission control for upstream identification calls.
+At most `concurrency` calls run at once; the rest wait in a bounded priority
+queue where interactive scans always go ahead of batch uploads and background
+jobs. When the queue is full, new interactive and batch calls are rejected
+immediately so the API can answer 429 instead of piling up upstream.
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from dotenv import load_dotenv
+from metrics import LatencyTracker
+
+load_dotenv()
+
+# Calls allowed to wait for a slot before new ones are rejected
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# Priority of the identification being served; set by the batch and job paths
+identify_priority: ContextVar[int] = ContextVar("identify_priority", default=INTERACTIVE)
+
+
+class QueueFull(Exception):
+    """No slot and no room to wait; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Identification queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PriorityScheduler:
+    def __init__(self, concurrency: int, max_queue: int = SCHEDULER_MAX_QUEUE):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.rejected = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.wait_time = {name: LatencyTracker() for name in PRIORITY_NAMES.values()}
+        self.run_time = LatencyTracker()
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a newly queued call"""
+        average = self.run_time.total / self.run_time.count if self.run_time.count else 1.0
+        return max(1, math.ceil((self.waiting() + 1) / self.concurrency * average))
+
+    async def _acquire(self, priority: int):
+        if self.active < self.concurrency and not self.waiting():
+            self.active += 1
+            return
+        # Background jobs are already queued durably and bounded by their
+        # worker count, so they wait instead of failing
+        if priority != BACKGROUND and self.waiting() >= self.max_queue:
+            self.rejected[PRIORITY_NAMES[priority]] += 1
+            raise QueueFull(self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the caller went away
+                self._release()
+            raise
+
+    def _release(self):
+        self.active -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+                return
+
+    @asynccontextmanager
+    async def slot(self, priority: int = None):
+        """Hold a slot for the body, at the context's priority by default"""
+        if priority is None:
+            priority = identify_priority.get()
+        name = PRIORITY_NAMES[priority]
+        queued = time.perf_counter()
+        await self._acquire(priority)
+        started = time.perf_counter()
+        self.admitted[name] += 1
+        self.wait_time[name].observe(started - queued)
+        try:
+            yield
+        finally:
+            self.run_time.observe(time.perf_counter() - started)
+            self._release()
+
+    async def run(self, func, *args, priority: int = None):
+        """Await `func(*args)` once a slot is free"""
+        async with self.slot(priority):
+            return await func(*args)
+
+    def stats(self) -> dict:
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[PRIORITY_NAMES[priority]] += 1
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_time": {name: tracker.snapshot() for name, tracker in self.wait_time.items()},
+            "run_time": self.run_time.snapshot()
+        }
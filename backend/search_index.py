@@ -0,0 +1,179 @@
+"""
+In-process inverted index for catalogue search.
+Searchable fields are tokenized with the same normalization as the name index
+into term -> {plant_id: weight} postings. Queries match every token, also as
+a prefix (for search-as-you-type), and results are ranked by
+field-weighted, IDF-scaled term scores. The work per query depends on the
+postings of the query terms, not on the size of the catalogue. Names are
+also indexed by their phonetic search keys, which queries in any script or
+spelling are reduced to as well.
+"""
+from bisect import bisect_left
+from typing import Dict, List
+import math
+import time
+from name_index import normalize_name, search_keys
+from transliteration import phonetic_keys
+from metrics import LatencyTracker
+
+# Relative importance of a term by the field it came from
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "sanskrit_name": 4.0,
+    "scientific_name": 4.0,
+    "botanical_synonyms": 3.0,
+    "vernacular_names": 3.0,
+    "search_keys": 3.0,
+    "family": 2.0,
+    "uses": 1.0,
+    "indication": 1.0,
+}
+# Prefix matches score below exact ones, and expand to at most this many terms
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_TERMS = 64
+MIN_INNER_PREFIX_LENGTH = 3
+# Extra score when the whole query starts the plant's name
+NAME_PREFIX_BONUS = 10.0
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize_name(text).split()
+
+
+def field_texts(plant: dict, field: str) -> List[str]:
+    if field == "search_keys":
+        return search_keys(plant)
+    value = plant.get(field)
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    return [item if isinstance(item, str) else " ".join(item) for item in value if item]
+
+
+class SearchIndex:
+    fields = tuple(FIELD_WEIGHTS)
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []  # sorted, for prefix ranges
+        self._plant_terms: Dict[str, List[str]] = {}
+        self._names: Dict[str, str] = {}  # plant_id -> normalized name
+        self.latency = LatencyTracker()
+
+    def rebuild(self, plants: List[dict]):
+        index = SearchIndex()
+        for plant in plants:
+            index._index(plant)
+        index._terms = sorted(index._postings)
+        self._postings, self._terms = index._postings, index._terms
+        self._plant_terms, self._names = index._plant_terms, index._names
+
+    def add(self, plant: dict):
+        self.remove(str(plant["_id"]))
+        for term in self._index(plant):
+            position = bisect_left(self._terms, term)
+            if position == len(self._terms) or self._terms[position] != term:
+                self._terms.insert(position, term)
+
+    def remove(self, plant_id: str):
+        for term in self._plant_terms.pop(plant_id, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(plant_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._terms, term)
+                if position < len(self._terms) and self._terms[position] == term:
+                    del self._terms[position]
+        self._names.pop(plant_id, None)
+
+    def _index(self, plant: dict) -> List[str]:
+        """Add a plant's postings; returns terms that are new to the index"""
+        plant_id = str(plant["_id"])
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for text in field_texts(plant, field):
+                for term in tokenize(text):
+                    weights[term] = weights.get(term, 0.0) + weight
+        new_terms = []
+        for term, weight in weights.items():
+            postings = self._postings.setdefault(term, {})
+            if not postings:
+                new_terms.append(term)
+            postings[plant_id] = weight
+        self._plant_terms[plant_id] = list(weights)
+        self._names[plant_id] = normalize_name(plant.get("name") or "")
+        return new_terms
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        terms = []
+        position = bisect_left(self._terms, prefix)
+        while position < len(self._terms) and len(terms) < MAX_PREFIX_TERMS:
+            term = self._terms[position]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            position += 1
+        return terms
+
+    def _idf(self, term: str) -> float:
+        return math.log(1 + len(self._plant_terms) / len(self._postings[term]))
+
+    def _token_scores(self, token: str, prefix: bool) -> Dict[str, float]:
+        """plant_id -> best score of any term this query token matches"""
+        scores: Dict[str, float] = {}
+        matches = []
+        for variant in dict.fromkeys([token, *phonetic_keys(token)]):
+            if variant in self._postings:
+                matches.append((variant, 1.0))
+            if prefix:
+                matches += [(term, PREFIX_WEIGHT) for term in self._prefix_terms(variant) if term != variant]
+        for term, factor in matches:
+            idf = self._idf(term)
+            for plant_id, weight in self._postings[term].items():
+                score = weight * idf * factor
+                if score > scores.get(plant_id, 0.0):
+                    scores[plant_id] = score
+        return scores
+
+    def search(self, query: str) -> List[str]:
+        """Plant ids matching every query token, best first"""
+        started = time.perf_counter()
+        results = self._search(query)
+        self.latency.observe(time.perf_counter() - started)
+        return results
+
+    def _search(self, query: str) -> List[str]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        totals = None
+        for position, token in enumerate(tokens):
+            # Short tokens only expand as the last, still-being-typed word
+            prefix = position == len(tokens) - 1 or len(token) >= MIN_INNER_PREFIX_LENGTH
+            scores = self._token_scores(token, prefix)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {
+                    plant_id: total + scores[plant_id]
+                    for plant_id, total in totals.items() if plant_id in scores
+                }
+            if not totals:
+                return []
+        phrase = " ".join(tokens)
+        for plant_id in totals:
+            if self._names.get(plant_id, "").startswith(phrase):
+                totals[plant_id] += NAME_PREFIX_BONUS
+        return sorted(totals, key=lambda plant_id: (-totals[plant_id], self._names.get(plant_id, "")))
+
+    def stats(self) -> dict:
+        return {
+            "plants": len(self._plant_terms),
+            "terms": len(self._postings),
+            "query_latency": self.latency.snapshot()
+        }
@@ -1,22 +1,59 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
+from datetime import datetime
 from typing import List, Optional
+import asyncio
+import base64
+import json
+import logging
 import os
+import time
 from dotenv import load_dotenv
 from models import (
     UserCreate, UserLogin, User, Plant, PlantCreate,
-    ScanHistory, IdentifyPlantRequest, IdentifyPlantResponse
+    ScanHistory, IdentifyPlantRequest, IdentifyPlantResponse, IdentifyBatchRequest
 )
 from auth import (
     get_password_hash, verify_password, create_access_token, get_current_user
 )
-from plant_identifier import identify_plant_from_image
+from plant_identifier import PlantIdentifier, unparsed_identification
+from scheduler import QueueFull, identify_priority, BATCH, BACKGROUND
+from circuit_breaker import CircuitOpen
+from identification_backends import SimulatedBackend
+from streaming_json import IncrementalJSONObjectParser
+from image_pipeline import (
+    ImageProcessingError, decode_base64_image, normalize_for_identification, run_in_image_pool
+)
+from image_store import image_store, store_image, image_url, hash_image, IMAGE_HASH_PATTERN
+from uploads import read_upload
+from identification_cache import IdentificationCache, compute_phash
+from singleflight import SingleFlight
+from idempotency import IdempotencyStore, fingerprint, validate_key
+from identify_jobs import IdentifyJobQueue
+from consensus import merge_identifications
+from catalogue import Catalogue
+from name_index import NameIndex, plant_search_keys
+from visual_index import VISUAL_MATCH_ENABLED, VISUAL_MATCH_MARGIN, VisualIndex
+from search_index import SearchIndex
+from fuzzy_index import FuzzyIndex
+from suggest_index import SuggestIndex
+from pagination import InvalidCursor, encode_cursor, decode_cursor
+import database
 import re
 
 load_dotenv()
 
+# Images of one batch identified concurrently
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Looser local matching used while the identification service is unavailable
+DEGRADED_CACHE_MAX_DISTANCE = int(os.getenv("DEGRADED_CACHE_MAX_DISTANCE", "12"))
+DEGRADED_VISUAL_THRESHOLD = float(os.getenv("DEGRADED_VISUAL_THRESHOLD", "0.9"))
+
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Ayurvedic Plants API")
 
 # CORS
@@ -28,31 +65,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/ayurvedic_plants")
-client = MongoClient(MONGO_URL)
-db = client.ayurvedic_plants
+# One long-lived vision model client for the whole process
+plant_identifier = PlantIdentifier()
+identification_cache = IdentificationCache(database.db.identification_cache)
+# Concurrent requests for the same image share one identification
+identify_flights = SingleFlight()
+# Replays of POSTs carrying the same Idempotency-Key get the stored response
+idempotency_store = IdempotencyStore(database.db.idempotency_keys)
+# Background identification jobs, shared by all uvicorn workers through Mongo
+identify_jobs = IdentifyJobQueue(
+    database.db.identify_jobs,
+    lambda image_bytes, user_id: run_job_identification(image_bytes, user_id)
+)
+# In-memory catalogue indexes, kept in sync with the plants collection
+catalogue = Catalogue(database.db.plants)
+plant_names = NameIndex()
+catalogue.register(plant_names)
+plant_search = SearchIndex()
+catalogue.register(plant_search)
+plant_fuzzy = FuzzyIndex()
+catalogue.register(plant_fuzzy)
+plant_suggest = SuggestIndex()
+catalogue.register(plant_suggest)
+# Scans that clearly show a catalogue photo are identified without the model
+# (VISUAL_MATCH_ENABLED=true)
+plant_images = VisualIndex(database.db.visual_features)
+if VISUAL_MATCH_ENABLED:
+    catalogue.register(plant_images)
+# The simulated backend (IDENTIFY_BACKEND=simulated) answers with catalogue plants
+if isinstance(plant_identifier.backend, SimulatedBackend):
+    catalogue.register(plant_identifier.backend)
+
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
-# Collections
-users_collection = db.users
-plants_collection = db.plants
-scans_collection = db.scans
+@app.on_event("startup")
+async def startup():
+    await database.ensure_indexes()
+    await identification_cache.ensure_indexes()
+    await identification_cache.warm()
+    await idempotency_store.ensure_indexes()
+    await plant_identifier.start()
+    await identify_jobs.ensure_indexes()
+    identify_jobs.start()
+    await catalogue.start()
+    await load_suggest_popularity()
 
-# Create indexes
-users_collection.create_index("username", unique=True)
-plants_collection.create_index("name")
-plants_collection.create_index("scientific_name")
+@app.on_event("shutdown")
+async def shutdown():
+    await catalogue.stop()
+    await identify_jobs.stop()
+    await plant_identifier.close()
 
 @app.get("/api")
 async def root():
     return {"message": "Ayurvedic Plants API", "version": "1.0"}
 
+@app.get("/api/health")
+async def health():
+    return {"identification": await plant_identifier.health()}
+
 # ============= AUTH ENDPOINTS =============
 
 @app.post("/api/auth/register")
 async def register(user: UserCreate):
     # Check if user exists
-    existing_user = users_collection.find_one({"username": user.username})
+    existing_user = await database.users.find_by_username(user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
@@ -62,11 +145,15 @@ async def register(user: UserCreate):
         "password_hash": get_password_hash(user.password),
         "created_at": None
     }
-    result = users_collection.insert_one(user_dict)
+    try:
+        user_id = await database.users.create(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same name
+        raise HTTPException(status_code=400, detail="Username already exists")
     
     # Create token
     access_token = create_access_token(
-        data={"sub": user.username, "user_id": str(result.inserted_id)}
+        data={"sub": user.username, "user_id": user_id}
     )
     
     return {
@@ -78,7 +165,7 @@ async def register(user: UserCreate):
 @app.post("/api/auth/login")
 async def login(user: UserLogin):
     # Find user
-    db_user = users_collection.find_one({"username": user.username})
+    db_user = await database.users.find_by_username(user.username)
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -103,103 +190,316 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 # ============= PLANT ENDPOINTS =============
 
+def read_cursor(cursor: str) -> dict:
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/plants")
 async def get_plants(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    query = {}
+    """
+    Pages by `skip`, or by the `next_cursor` of the previous page, which
+    costs the same at any depth
+    """
+    did_you_mean = None
+    next_cursor = None
     if search:
-        # Case-insensitive search
-        regex = re.compile(search, re.IGNORECASE)
-        query = {
-            "$or": [
-                {"name": regex},
-                {"scientific_name": regex},
-                {"family": regex}
-            ]
-        }
+        # Ranked ids from the in-memory index; Mongo only serves the page
+        plant_ids = plant_search.search(search)
+        if not plant_ids:
+            # Nothing matched as typed: retry tolerating typos in plant names
+            plant_ids, did_you_mean = plant_fuzzy.search(search)
+        total = len(plant_ids)
+        if cursor:
+            position = read_cursor(cursor)
+            if position.get("search") != search or not isinstance(position.get("offset"), int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            skip = max(position["offset"], 0)
+        plants = await database.plants.list_cards_by_ids(plant_ids[skip:skip + limit])
+        if skip + limit < total:
+            next_cursor = encode_cursor({"search": search, "offset": skip + limit})
+    else:
+        after = None
+        if cursor:
+            position = read_cursor(cursor)
+            if not ObjectId.is_valid(position.get("id")):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            after, skip = ObjectId(position["id"]), 0
+        # Only card fields and the first image are projected out of Mongo;
+        # one extra card tells whether there is a next page. The total is
+        # counted for the first page only, not again for every cursor page
+        if cursor:
+            plants, total = await database.plants.list_cards({}, skip, limit + 1, after=after), None
+        else:
+            plants, total = await asyncio.gather(
+                database.plants.list_cards({}, skip, limit + 1, after=after),
+                database.plants.count({})
+            )
+        if len(plants) > limit:
+            plants = plants[:limit]
+            next_cursor = encode_cursor({"id": str(plants[-1]["_id"])})
     
-    plants = list(plants_collection.find(query).skip(skip).limit(limit))
-    total = plants_collection.count_documents(query)
-    
-    # Convert ObjectId to string and handle images
     for plant in plants:
         plant["_id"] = str(plant["_id"])
-        # Only send first image in list view for performance
-        if "images_base64" in plant and len(plant["images_base64"]) > 0:
-            plant["thumbnail"] = plant["images_base64"][0]
-            del plant["images_base64"]  # Remove full images from list
+        plant["thumbnail_url"] = image_url(plant.pop("thumbnail_hash", None))
     
     return {
         "plants": plants,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "did_you_mean": did_you_mean
     }
 
+async def load_suggest_popularity():
+    """Rank suggestions by past scans; new scans are counted as they happen"""
+    counts = {}
+    for name, count in (await database.scans.count_by_plant_name()).items():
+        match = plant_names.match({"plant_name": name})
+        if match:
+            counts[match[0]] = counts.get(match[0], 0) + count
+    plant_suggest.set_popularity(counts)
+
+@app.get("/api/plants/suggest")
+async def suggest_plants(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Search-as-you-type: answered from memory, never touches Mongo"""
+    return {"query": q, "suggestions": plant_suggest.suggest(q, limit)}
+
 @app.get("/api/plants/{plant_id}")
-async def get_plant(plant_id: str):
+async def get_plant(
+    plant_id: str,
+    image_size: str = Query("medium", pattern="^(thumbnail|medium|full)$")
+):
     if not ObjectId.is_valid(plant_id):
         raise HTTPException(status_code=400, detail="Invalid plant ID")
     
-    plant = plants_collection.find_one({"_id": ObjectId(plant_id)})
+    plant = await database.plants.get(plant_id)
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
     
     plant["_id"] = str(plant["_id"])
+    # Images are fetched separately (and cached) through /api/images
+    plant["image_urls"] = [image_url(refs[image_size]) for refs in plant.pop("images", [])]
     return plant
 
 @app.post("/api/plants")
 async def create_plant(
     plant: PlantCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     plant_dict = plant.model_dump()
-    result = plants_collection.insert_one(plant_dict)
-    plant_dict["_id"] = str(result.inserted_id)
-    return plant_dict
+    
+    async def insert_plant():
+        images_base64 = plant_dict.pop("images_base64")
+        try:
+            plant_dict["images"] = list(await asyncio.gather(*[
+                store_image(decode_base64_image(image)) for image in images_base64
+            ]))
+        except ImageProcessingError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        plant_dict["search_keys"] = plant_search_keys(plant_dict)
+        plant_dict["_id"] = await database.plants.create(plant_dict)
+        await catalogue.add(plant_dict)
+        plant_dict["image_urls"] = [image_url(refs["medium"]) for refs in plant_dict.pop("images")]
+        return plant_dict
+    
+    return await idempotency_store.run(
+        idempotency_scope(current_user, "create_plant", idempotency_key),
+        fingerprint(plant_dict),
+        insert_plant
+    )
+
+def idempotency_scope(current_user: dict, endpoint: str, key: Optional[str]) -> Optional[str]:
+    """Keys are only meaningful per user and per endpoint"""
+    validate_key(key)
+    return f"{current_user['user_id']}:{endpoint}:{key}" if key else None
 
 # ============= PLANT IDENTIFICATION =============
 
-@app.post("/api/plants/identify")
-async def identify_plant(
-    request: IdentifyPlantRequest,
-    current_user: dict = Depends(get_current_user)
-):
-    # Call OpenAI Vision API
-    result = await identify_plant_from_image(request.image_base64)
+# Descriptive fields sent as individual SSE events once complete
+STREAMED_FIELDS = (
+    "family", "characteristics", "medicinal_properties", "uses", "parts_used", "description"
+)
+
+async def identify_image(image_bytes: bytes) -> dict:
+    """Identify via the perceptual-hash cache, falling back to the vision model"""
+    phash = await run_in_image_pool(compute_phash, image_bytes)
+    if phash is not None:
+        cached = await identification_cache.get(phash)
+        if cached:
+            result, distance = cached
+            return {**result, "cache": {"hit": True, "distance": distance}}
     
-    if not result["success"]:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to identify plant: {result.get('error', 'Unknown error')}"
+    try:
+        result = await identify_visually(image_bytes)
+        if result is None:
+            result = await identify_two_stage(base64.b64encode(image_bytes).decode("utf-8"))
+    except CircuitOpen as e:
+        return {**await degraded_identification(image_bytes, phash, str(e)), "cache": {"hit": False}}
+    if result["success"] and phash is not None:
+        await identification_cache.put(phash, result)
+    return {**result, "cache": {"hit": False}}
+
+async def identify_visually(image_bytes: bytes, **match_options) -> Optional[dict]:
+    """Identification from the nearest catalogue image, if it is close enough"""
+    if not VISUAL_MATCH_ENABLED:
+        return None
+    match = await plant_images.match(image_bytes, **match_options)
+    if match is None:
+        return None
+    db_plant = await database.plants.get(match["plant_id"])
+    if db_plant is None:
+        return None
+    data = {
+        **catalogue_plant_data(db_plant, {"confidence": match["confidence"]}),
+        "source": "visual_match",
+        "visual_match": {"similarity": match["similarity"], "neighbours": match["neighbours"]}
+    }
+    return {"success": True, "data": data, "raw_response": json.dumps(data, default=str)}
+
+async def degraded_identification(image_bytes: bytes, phash: Optional[int], reason: str) -> dict:
+    """
+    Best local answer while the identification circuit is open: a looser cache
+    match, then a looser visual catalogue match, then an explicit low-confidence
+    placeholder. Always flagged `degraded` and never cached.
+    """
+    result = None
+    cached = None
+    if phash is not None:
+        cached = await identification_cache.get(phash, max_distance=DEGRADED_CACHE_MAX_DISTANCE)
+    if cached:
+        result = cached[0]
+    if result is None:
+        result = await identify_visually(image_bytes, threshold=DEGRADED_VISUAL_THRESHOLD, margin=VISUAL_MATCH_MARGIN)
+    if result is None:
+        data = {
+            **unparsed_identification(f"{reason}. This is a placeholder result; please scan again later."),
+            "source": "degraded"
+        }
+    else:
+        data = {**result["data"], "confidence": "low"}
+    data["degraded"] = True
+    return {"success": True, "data": data, "raw_response": json.dumps(data, default=str)}
+
+async def identify_two_stage(image_base64: str) -> dict:
+    """
+    Ask the model for names only; plants found in the catalogue are described
+    from curated data, and the full descriptive prompt runs only for the rest.
+    """
+    names = await plant_identifier.identify_name(image_base64)
+    if not names["success"]:
+        return names
+    db_plant = await find_catalogue_plant(names["data"])
+    if db_plant:
+        return {
+            "success": True,
+            "data": catalogue_plant_data(db_plant, names["data"]),
+            "raw_response": names["raw_response"]
+        }
+    return await plant_identifier.identify(image_base64)
+
+async def catalogue_chunks(image_base64: str):
+    """Two-stage identification as text chunks of one JSON object, for streaming"""
+    names = await plant_identifier.identify_name(image_base64)
+    if not names["success"]:
+        raise RuntimeError(names.get("error", "Unknown error"))
+    db_plant = await find_catalogue_plant(names["data"])
+    if db_plant:
+        yield json.dumps(catalogue_plant_data(db_plant, names["data"]), default=str)
+        return
+    async for chunk in plant_identifier.stream(image_base64):
+        yield chunk
+
+def catalogue_plant_data(db_plant: dict, names: dict) -> dict:
+    """Identification data filled from a curated catalogue entry"""
+    ayurvedic = {
+        field: db_plant[field]
+        for field in ("rasa", "guna", "virya", "vipaka", "prabhava", "dosha_karma", "karma")
+        if db_plant.get(field)
+    }
+    return {
+        "plant_name": db_plant["name"],
+        "scientific_name": db_plant.get("scientific_name") or names.get("scientific_name"),
+        "sanskrit_name": db_plant.get("sanskrit_name"),
+        "family": db_plant.get("family"),
+        "confidence": names.get("confidence", "low"),
+        "characteristics": db_plant.get("characteristics", []),
+        "medicinal_properties": db_plant.get("medicinal_properties", []),
+        "uses": db_plant.get("uses", []),
+        "parts_used": db_plant.get("parts_used", []),
+        "description": db_plant.get("description", ""),
+        "ayurvedic_properties": ayurvedic or None,
+        "source": "catalogue"
+    }
+
+async def prepare_scan_image(image_bytes: bytes) -> tuple:
+    """Normalize a scan image; returns (image_bytes, preprocessing stats or None)"""
+    # Smaller, metadata-free images mean fewer vision tokens and smaller scans
+    try:
+        image_bytes, preprocessing = await run_in_image_pool(
+            normalize_for_identification, image_bytes
         )
-    
-    plant_data = result["data"]
-    
-    # Check if plant exists in database
-    db_plant = None
-    database_plant_id = None
-    if plant_data.get("plant_name"):
-        # Search for matching plant
-        regex = re.compile(plant_data["plant_name"], re.IGNORECASE)
-        db_plant = plants_collection.find_one({"name": regex})
-        if db_plant:
-            database_plant_id = str(db_plant["_id"])
-    
-    # Save scan history
-    scan_record = {
-        "user_id": current_user["user_id"],
-        "scanned_image_base64": request.image_base64,
+        logger.info(
+            "Normalized scan image %d -> %d bytes in %.1fms",
+            preprocessing["bytes_in"], preprocessing["bytes_out"], preprocessing["duration_ms"]
+        )
+        return image_bytes, preprocessing
+    except ImageProcessingError as e:
+        # Let the vision model try formats Pillow can't decode
+        logger.warning("Image normalization skipped: %s", e)
+        return image_bytes, None
+
+def match_catalogue_plant(plant_data: dict) -> tuple:
+    """(database_plant_id, match_reason) for an identification, or (None, None)"""
+    match = plant_names.match(plant_data)
+    if not match:
+        return None, None
+    # Every scan of a catalogue plant makes it a likelier suggestion
+    plant_suggest.record(match[0])
+    return match
+
+async def find_catalogue_plant(plant_data: dict) -> Optional[dict]:
+    """Return the catalogue plant matching an identification, if any"""
+    match = plant_names.match(plant_data)
+    return await database.plants.get(match[0]) if match else None
+
+async def build_scan_record(
+    user_id: str, image_bytes: bytes, plant_data: dict, raw_response: str, **details
+) -> dict:
+    # The image goes to the image store, not the document; images Pillow
+    # can't read are kept as their original bytes, without variants
+    scanned_image = await store_image(image_bytes, variants_required=False)
+    return {
+        "user_id": user_id,
+        "scanned_image": scanned_image,
         "identified_plant_name": plant_data.get("plant_name", "Unknown"),
         "confidence": plant_data.get("confidence", "low"),
-        "ai_response": result["raw_response"],
-        "timestamp": None
+        "ai_response": raw_response,
+        **details,
+        "timestamp": datetime.utcnow()
     }
-    scan_result = scans_collection.insert_one(scan_record)
-    
+
+async def save_scan(
+    user_id: str, image_bytes: bytes, plant_data: dict, raw_response: str, **details
+) -> str:
+    scan_record = await build_scan_record(user_id, image_bytes, plant_data, raw_response, **details)
+    return await database.scans.create(scan_record)
+
+def build_identify_response(
+    plant_data: dict, database_plant_id: Optional[str], scan_id: str,
+    match_reason: Optional[dict] = None
+) -> dict:
     return {
         "plant_name": plant_data.get("plant_name", "Unknown"),
         "scientific_name": plant_data.get("scientific_name"),
@@ -208,30 +508,435 @@ async def identify_plant(
         "medicinal_properties": plant_data.get("medicinal_properties", []),
         "uses": plant_data.get("uses", []),
         "parts_used": plant_data.get("parts_used", []),
-        "matches_database": db_plant is not None,
+        "matches_database": database_plant_id is not None,
         "database_plant_id": database_plant_id,
+        "match_reason": match_reason,
         "full_description": plant_data.get("description", ""),
-        "scan_id": str(scan_result.inserted_id)
+        "sanskrit_name": plant_data.get("sanskrit_name"),
+        "ayurvedic_properties": plant_data.get("ayurvedic_properties"),
+        "source": plant_data.get("source", "model"),
+        "visual_match": plant_data.get("visual_match"),
+        "degraded": plant_data.get("degraded", False),
+        "scan_id": scan_id
+    }
+
+async def run_identification(image_bytes: bytes, user_id: str) -> dict:
+    """Identify the plant in an image, record the scan and build the response"""
+    image_bytes, preprocessing = await prepare_scan_image(image_bytes)
+    
+    result, coalesced = await identify_flights.do(
+        hash_image(image_bytes), identify_image, image_bytes
+    )
+    
+    if not result["success"]:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to identify plant: {result.get('error', 'Unknown error')}"
+        )
+    
+    plant_data = result["data"]
+    
+    # Check if plant exists in database
+    database_plant_id, match_reason = match_catalogue_plant(plant_data)
+    
+    scan_id = await save_scan(
+        user_id, image_bytes, plant_data, result["raw_response"],
+        preprocessing=preprocessing, cache=result["cache"], coalesced=coalesced
+    )
+    return build_identify_response(plant_data, database_plant_id, scan_id, match_reason)
+
+async def run_job_identification(image_bytes: bytes, user_id: str) -> dict:
+    """Background jobs queue behind interactive and batch scans for model slots"""
+    identify_priority.set(BACKGROUND)
+    return await run_identification(image_bytes, user_id)
+
+async def identify_batch_image(image_bytes: bytes, user_id: str, slots: asyncio.Semaphore) -> dict:
+    """
+    Identify one image of a batch and build (but don't insert) its scan.
+    Failures, including a full queue, are returned as that item's error so
+    the rest of the batch still counts.
+    """
+    async with slots:
+        started = time.perf_counter()
+        try:
+            image_bytes, preprocessing = await prepare_scan_image(image_bytes)
+            result, coalesced = await identify_flights.do(
+                hash_image(image_bytes), identify_image, image_bytes
+            )
+        except Exception as e:
+            if not isinstance(e, (QueueFull, ImageProcessingError)):
+                logger.exception("Batch image identification failed")
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            return {"error": str(e), "exception": e, "latency_ms": latency_ms}
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    if not result["success"]:
+        return {"error": result.get("error", "Unknown error"), "latency_ms": latency_ms}
+    scan_record = await build_scan_record(
+        user_id, image_bytes, result["data"], result["raw_response"],
+        preprocessing=preprocessing, cache=result["cache"], coalesced=coalesced,
+        latency_ms=latency_ms
+    )
+    return {"plant_data": result["data"], "scan_record": scan_record, "latency_ms": latency_ms}
+
+async def run_batch_identification(images: List[bytes], user_id: str) -> dict:
+    """Identify several photos of one specimen and merge them into a consensus"""
+    identify_priority.set(BATCH)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*[
+        identify_batch_image(image_bytes, user_id, slots) for image_bytes in images
+    ])
+    succeeded = [outcome for outcome in outcomes if "plant_data" in outcome]
+    if not succeeded:
+        if all(isinstance(outcome.get("exception"), QueueFull) for outcome in outcomes):
+            raise outcomes[0]["exception"]
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to identify plant: {outcomes[0]['error']}"
+        )
+    
+    plant_data, agreement = merge_identifications([o["plant_data"] for o in succeeded])
+    database_plant_id, match_reason = match_catalogue_plant(plant_data)
+    
+    # All scans of the batch in one round trip
+    batch_id = str(ObjectId())
+    for outcome in succeeded:
+        outcome["scan_record"]["batch_id"] = batch_id
+    scan_ids = iter(await database.scans.create_many([o["scan_record"] for o in succeeded]))
+    
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if "plant_data" in outcome:
+            results.append({
+                "index": index,
+                "plant_name": outcome["plant_data"].get("plant_name", "Unknown"),
+                "confidence": outcome["plant_data"].get("confidence", "low"),
+                "scan_id": next(scan_ids),
+                "latency_ms": outcome["latency_ms"]
+            })
+        else:
+            results.append({"index": index, "error": outcome["error"], "latency_ms": outcome["latency_ms"]})
+    
+    response = build_identify_response(plant_data, database_plant_id, None, match_reason)
+    del response["scan_id"]  # one scan per image, listed in results
+    return {
+        **response,
+        "batch_id": batch_id,
+        "agreement": agreement,
+        "results": results,
+        "total_latency_ms": round((time.perf_counter() - started) * 1000, 2)
     }
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def replay_chunks(text: str):
+    yield text
+
+async def with_degraded_fallback(chunks, image_bytes: bytes, phash: Optional[int]):
+    """Replay the degraded answer if the circuit is open before any output was streamed"""
+    streamed = False
+    try:
+        async for chunk in chunks:
+            streamed = True
+            yield chunk
+    except CircuitOpen as e:
+        if streamed:
+            raise
+        yield (await degraded_identification(image_bytes, phash, str(e)))["raw_response"]
+
+async def stream_identification(image_bytes: bytes, user_id: str):
+    """
+    Server-Sent Events for one identification: `identification` (name and
+    confidence), then `match` (catalogue lookup), then one `field` event per
+    descriptive field as the model finishes it, and finally `done` with the
+    same body /api/plants/identify returns. Any failure, from preparing the
+    image to saving the scan, ends the stream with an `error` event instead.
+    """
+    try:
+        async for event in identification_events(image_bytes, user_id):
+            yield event
+    except QueueFull as e:
+        yield sse_event("error", {"detail": str(e), "status_code": 429, "retry_after": e.retry_after})
+    except Exception as e:
+        logger.exception("Streaming identification failed")
+        yield sse_event("error", {"detail": f"Failed to identify plant: {e}"})
+
+async def identification_events(image_bytes: bytes, user_id: str):
+    image_bytes, preprocessing = await prepare_scan_image(image_bytes)
+    phash = await run_in_image_pool(compute_phash, image_bytes)
+    cached = await identification_cache.get(phash) if phash is not None else None
+    visual = None if cached else await identify_visually(image_bytes)
+    if cached:
+        chunks = replay_chunks(json.dumps(cached[0]["data"], default=str))
+        cache_info = {"hit": True, "distance": cached[1]}
+    elif visual:
+        chunks = replay_chunks(visual["raw_response"])
+        cache_info = {"hit": False}
+    else:
+        chunks = with_degraded_fallback(
+            catalogue_chunks(base64.b64encode(image_bytes).decode("utf-8")), image_bytes, phash
+        )
+        cache_info = {"hit": False}
+    
+    parser = IncrementalJSONObjectParser()
+    database_plant_id = match_reason = None
+    matched = False
+    
+    async def announce(plant_data: dict):
+        nonlocal database_plant_id, match_reason, matched
+        yield sse_event("identification", {
+            "plant_name": plant_data.get("plant_name", "Unknown"),
+            "scientific_name": plant_data.get("scientific_name"),
+            "confidence": plant_data.get("confidence", "low")
+        })
+        database_plant_id, match_reason = match_catalogue_plant(plant_data)
+        matched = True
+        yield sse_event("match", {
+            "matches_database": database_plant_id is not None,
+            "database_plant_id": database_plant_id,
+            "match_reason": match_reason
+        })
+    
+    async for chunk in chunks:
+        for key, value in parser.feed(chunk):
+            if not matched and {"plant_name", "confidence"} <= parser.fields.keys():
+                async for event in announce(parser.fields):
+                    yield event
+            if key in STREAMED_FIELDS:
+                yield sse_event("field", {"name": key, "value": value})
+    
+    raw_response = parser.buffer
+    plant_data = parser.fields if parser.complete else unparsed_identification(raw_response)
+    if not matched:
+        async for event in announce(plant_data):
+            yield event
+    if not cached and phash is not None and not plant_data.get("degraded"):
+        await identification_cache.put(
+            phash, {"success": True, "data": plant_data, "raw_response": raw_response}
+        )
+    
+    scan_id = await save_scan(
+        user_id, image_bytes, plant_data, raw_response,
+        preprocessing=preprocessing, cache=cache_info, coalesced=False
+    )
+    yield sse_event("done", build_identify_response(plant_data, database_plant_id, scan_id, match_reason))
+
+@app.post("/api/plants/identify")
+async def identify_plant(
+    request: IdentifyPlantRequest,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    try:
+        image_bytes = decode_base64_image(request.image_base64)
+    except ImageProcessingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await idempotency_store.run(
+        idempotency_scope(current_user, "identify", idempotency_key),
+        fingerprint(image_bytes),
+        lambda: run_identification(image_bytes, current_user["user_id"])
+    )
+
+@app.post("/api/plants/identify/stream")
+async def identify_plant_stream(
+    request: IdentifyPlantRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of /api/plants/identify as text/event-stream.
+    LlmBackend has no native streaming and returns the model's answer in one
+    piece, so with it the early `identification` event comes from the quick
+    name-only call and the `field` events all arrive when the full answer does.
+    """
+    try:
+        image_bytes = decode_base64_image(request.image_base64)
+    except ImageProcessingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_identification(image_bytes, current_user["user_id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/plants/identify/batch")
+async def identify_plant_batch(
+    request: IdentifyBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Identify several photos of the same specimen with one consensus answer"""
+    try:
+        images = [decode_base64_image(image) for image in request.images_base64]
+    except ImageProcessingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_batch_identification(images, current_user["user_id"])
+
+@app.post("/api/plants/identify/upload")
+async def identify_plant_upload(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Same as /api/plants/identify but takes the photo as a multipart `image` file"""
+    image_bytes = await read_upload(request, field_name="image")
+    return await idempotency_store.run(
+        idempotency_scope(current_user, "identify", idempotency_key),
+        fingerprint(image_bytes),
+        lambda: run_identification(image_bytes, current_user["user_id"])
+    )
+
+# ============= IDENTIFICATION JOBS =============
+
+def serialize_job(job: dict) -> dict:
+    return {
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+
+@app.post("/api/identify/jobs", status_code=202)
+async def create_identify_job(
+    request: IdentifyPlantRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue an identification and return its job id without waiting for the model"""
+    try:
+        image_bytes = decode_base64_image(request.image_base64)
+    except ImageProcessingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job_id = await identify_jobs.enqueue(image_bytes, current_user["user_id"])
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/identify/jobs/{job_id}")
+async def get_identify_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=25),
+    current_user: dict = Depends(get_current_user)
+):
+    """Job status and result; `wait` long-polls up to that many seconds"""
+    job = await identify_jobs.get(job_id, current_user["user_id"], wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
 @app.get("/api/scans/history")
 async def get_scan_history(
     current_user: dict = Depends(get_current_user),
     skip: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=50)
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None
 ):
-    scans = list(
-        scans_collection
-        .find({"user_id": current_user["user_id"]})
-        .sort("timestamp", -1)
-        .skip(skip)
-        .limit(limit)
-    )
+    before = None
+    if cursor:
+        position = read_cursor(cursor)
+        try:
+            timestamp = datetime.fromisoformat(position["timestamp"]) if position.get("timestamp") else None
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not ObjectId.is_valid(position.get("id")):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before, skip = (timestamp, ObjectId(position["id"])), 0
+    scans = await database.scans.history(current_user["user_id"], skip, limit + 1, before=before)
+    
+    next_cursor = None
+    if len(scans) > limit:
+        scans = scans[:limit]
+        last = scans[-1]
+        next_cursor = encode_cursor({
+            "timestamp": last["timestamp"].isoformat() if last.get("timestamp") else None,
+            "id": str(last["_id"])
+        })
     
     for scan in scans:
         scan["_id"] = str(scan["_id"])
+        scan["thumbnail_url"] = image_url(scan.pop("thumbnail_hash", None))
+    
+    return {"scans": scans, "total": len(scans), "next_cursor": next_cursor}
+
+# ============= IMAGES =============
+
+def parse_range_header(range_header: str, size: int):
+    """Parse a single `bytes=start-end` range; returns (start, end) inclusive"""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+@app.get("/api/images/{image_hash}")
+async def get_image(image_hash: str, request: Request):
+    if not IMAGE_HASH_PATTERN.match(image_hash):
+        raise HTTPException(status_code=400, detail="Invalid image hash")
+    
+    info = await image_store.stat(image_hash)
+    if not info:
+        raise HTTPException(status_code=404, detail="Image not found")
     
-    return {"scans": scans, "total": len(scans)}
+    # Content-addressed, so the bytes behind a hash never change
+    headers = {
+        "ETag": f'"{image_hash}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes"
+    }
+    if request.headers.get("if-none-match") in (f'"{image_hash}"', image_hash, "*"):
+        return Response(status_code=304, headers=headers)
+    
+    size = info["size"]
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", f'"{image_hash}"') == f'"{image_hash}"':
+        byte_range = parse_range_header(range_header, size)
+    
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, end = 0, size - 1
+        status_code = 200
+    headers["Content-Length"] = str(end - start + 1)
+    
+    return StreamingResponse(
+        image_store.stream(image_hash, start, end),
+        status_code=status_code,
+        media_type=info["content_type"],
+        headers=headers
+    )
+
+# ============= METRICS =============
+
+@app.get("/api/metrics")
+async def get_metrics():
+    return {
+        "identification_cache": identification_cache.stats(),
+        "identify_coalescing": identify_flights.stats(),
+        "idempotency": idempotency_store.stats(),
+        "identify_jobs": await identify_jobs.stats(),
+        "identify_scheduler": plant_identifier.scheduler.stats(),
+        "identify_upstream": plant_identifier.stats(),
+        "identify_circuit": plant_identifier.breaker.stats(),
+        "name_index": plant_names.stats(),
+        "search_index": plant_search.stats(),
+        "fuzzy_index": plant_fuzzy.stats(),
+        "suggest_index": plant_suggest.stats(),
+        "visual_index": plant_images.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,78 @@
+"""
+Incremental parser for a JSON object arriving in text chunks.
+Any prose or ``` fences before the object are skipped, and each top-level
+member is emitted as soon as its value is complete, so callers can act on
+"plant_name" long before the model has finished writing "description".
+A braced span with no members or one that isn't valid JSON ("I think {maybe}
+it is: {...}") is not taken as the object; scanning continues after it.
+"""
+import json
+
+
+class IncrementalJSONObjectParser:
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self._failed = False
+
+    def feed(self, chunk: str) -> list:
+        """Add text; returns [(key, value), ...] for members completed by it"""
+        self.buffer += chunk
+        completed = []
+        object_start = 0  # index in `completed` of the current object's first member
+        buffer = self.buffer
+        while self._pos < len(buffer) and not self.complete:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char == "[":
+                        # Not an object; keep looking for one
+                        self._depth = 0
+                    else:
+                        self._member_start = self._pos + 1
+                        object_start = len(completed)
+            elif char in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_member(self._pos))
+                    if self.fields and not self._failed:
+                        self.complete = True
+                    else:
+                        # Not the object; keep looking for one
+                        del completed[object_start:]
+                        self.fields = {}
+                        self._failed = False
+            elif char == "," and self._depth == 1:
+                completed.extend(self._close_member(self._pos))
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self, end: int) -> list:
+        member = self.buffer[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            self._failed = True
+            return []
+        self.fields.update(parsed)
+        return list(parsed.items())
@@ -0,0 +1,164 @@
+"""
+Prefix autocomplete over plant names for search-as-you-type.
+Every common, Sanskrit and vernacular name is normalized into a sorted array
+of (key, plant_id, label) entries, one per word start, so "bas" finds both
+"Basil" and "Holy Basil". A query is one bisect to the start of its prefix
+range; plants in the range are ranked by how often scans identified them,
+and the top-k for short, busy prefixes are cached until the index changes.
+Names are also entered under their phonetic keys, so "pasu" suggests "పసుపు".
+"""
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+import heapq
+import math
+import os
+import time
+from dotenv import load_dotenv
+from metrics import LatencyTracker
+from name_index import LIST_SEPARATORS, PARENTHETICAL, normalize_name
+from transliteration import phonetic_keys
+
+load_dotenv()
+
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+# Prefixes up to this length match large ranges; their results are cached
+CACHED_PREFIX_LENGTH = 2
+
+# Label shown for a plant when several of its names match, best first
+FIELD_PRIORITY = {"name": 0, "sanskrit_name": 1, "vernacular_names": 2}
+# Matches at the start of the full name rank above matches on an inner word
+INNER_WORD_PENALTY = 0.5
+
+
+def name_labels(text: str) -> List[Tuple[str, str]]:
+    """(normalized key, display label) for each name in e.g. "हरिद्रा (Haridra)" """
+    labels = []
+    for part in LIST_SEPARATORS.split(text):
+        for variant in [PARENTHETICAL.sub(" ", part), *PARENTHETICAL.findall(part)]:
+            label = " ".join(variant.split())
+            key = normalize_name(label)
+            if key and all(key != existing for existing, _ in labels):
+                labels.append((key, label))
+    return labels
+
+
+def plant_labels(plant: dict) -> List[Tuple[str, str, str]]:
+    """(key, label, field) for every name the plant is suggested under"""
+    labels = [(key, label, "name") for key, label in name_labels(plant.get("name") or "")]
+    labels += [(key, label, "sanskrit_name") for key, label in name_labels(plant.get("sanskrit_name") or "")]
+    for names in (plant.get("vernacular_names") or {}).values():
+        text = names if isinstance(names, str) else " / ".join(names)
+        labels += [(key, label, "vernacular_names") for key, label in name_labels(text)]
+    return labels
+
+
+class SuggestIndex:
+    fields = ("name", "sanskrit_name", "vernacular_names")
+
+    def __init__(self):
+        # (key suffix from a word start, word position, field rank, plant_id, label)
+        self._entries: List[Tuple[str, int, int, str, str]] = []
+        self._plant_entries: Dict[str, List[tuple]] = {}
+        self._names: Dict[str, str] = {}
+        self._popularity: Dict[str, int] = {}
+        self._cache: Dict[Tuple[str, int], List[dict]] = {}
+        self.latency = LatencyTracker()
+
+    def rebuild(self, plants: List[dict]):
+        index = SuggestIndex()
+        for plant in plants:
+            index._plant_entries[str(plant["_id"])] = index._index(plant)
+        index._entries = sorted(entry for entries in index._plant_entries.values() for entry in entries)
+        self._entries, self._plant_entries, self._names = index._entries, index._plant_entries, index._names
+        self._cache = {}
+
+    def add(self, plant: dict):
+        plant_id = str(plant["_id"])
+        self.remove(plant_id)
+        entries = self._index(plant)
+        for entry in entries:
+            insort(self._entries, entry)
+        self._plant_entries[plant_id] = entries
+        self._cache = {}
+
+    def remove(self, plant_id: str):
+        for entry in self._plant_entries.pop(plant_id, []):
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+        self._names.pop(plant_id, None)
+        self._cache = {}
+
+    def _index(self, plant: dict) -> List[tuple]:
+        plant_id = str(plant["_id"])
+        self._names[plant_id] = plant.get("name") or ""
+        entries = set()
+        for key, label, field in plant_labels(plant):
+            for variant in [key, *phonetic_keys(key)]:
+                words = variant.split(" ")
+                for position in range(len(words)):
+                    entries.add((" ".join(words[position:]), position, FIELD_PRIORITY[field], plant_id, label))
+        return list(entries)
+
+    def set_popularity(self, counts: Dict[str, int]):
+        """Scan counts by plant id, e.g. aggregated from scan history at startup"""
+        self._popularity = dict(counts)
+        self._cache = {}
+
+    def record(self, plant_id: str):
+        """Count one more scan of a catalogue plant"""
+        self._popularity[plant_id] = self._popularity.get(plant_id, 0) + 1
+        # Cached short prefixes may be slightly stale until the next change
+
+    def _score(self, plant_id: str, position: int) -> float:
+        score = math.log1p(self._popularity.get(plant_id, 0)) + 1.0
+        return score * INNER_WORD_PENALTY if position else score
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> List[dict]:
+        """Top plants with a name (or a word of one) starting with the query"""
+        started = time.perf_counter()
+        prefix = normalize_name(query)
+        results = self._suggest(prefix, limit) if prefix else []
+        self.latency.observe(time.perf_counter() - started)
+        return results
+
+    def _suggest(self, prefix: str, limit: int) -> List[dict]:
+        cached = len(prefix) <= CACHED_PREFIX_LENGTH
+        if cached and (prefix, limit) in self._cache:
+            return self._cache[prefix, limit]
+        best: Dict[str, Tuple[float, int, int, str]] = {}
+        for variant in dict.fromkeys([prefix, *phonetic_keys(prefix)]):
+            position = bisect_left(self._entries, (variant,))
+            while position < len(self._entries):
+                key, word, field_rank, plant_id, label = self._entries[position]
+                if not key.startswith(variant):
+                    break
+                position += 1
+                # Smaller is better: score, then the preferred and shortest label
+                candidate = (-self._score(plant_id, word), field_rank, len(label), label)
+                current = best.get(plant_id)
+                if current is None or candidate < current:
+                    best[plant_id] = candidate
+        top = heapq.nsmallest(
+            limit, best.items(), key=lambda item: (item[1][0], self._names.get(item[0], ""))
+        )
+        results = [
+            {
+                "_id": plant_id,
+                "name": self._names.get(plant_id, ""),
+                "matched_name": label,
+                "scans": self._popularity.get(plant_id, 0)
+            }
+            for plant_id, (_, _, _, label) in top
+        ]
+        if cached:
+            self._cache[prefix, limit] = results
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "plants": len(self._plant_entries),
+            "entries": len(self._entries),
+            "cached_prefixes": len(self._cache),
+            "query_latency": self.latency.snapshot()
+        }
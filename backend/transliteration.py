@@ -0,0 +1,183 @@
+"""
+Romanization of Indic scripts and phonetic keys for cross-script name lookup.
+The Brahmic scripts in Unicode (Devanagari, Bengali, Gurmukhi, Gujarati,
+Oriya, Tamil, Telugu, Kannada, Malayalam) share one block layout, so a single
+table keyed by offset romanizes all of them. Romanized and Latin names are
+then reduced to a loose phonetic key (no vowel length, aspiration or doubled
+letters), so "हरिद्रा", "Haridra" and "Hareedra" all meet at "haridra".
+"""
+from typing import List, Optional
+import re
+import unicodedata
+
+# First code point of each supported script's block
+SCRIPT_BLOCKS = {
+    0x0900: "devanagari",
+    0x0980: "bengali",
+    0x0A00: "gurmukhi",
+    0x0A80: "gujarati",
+    0x0B00: "oriya",
+    0x0B80: "tamil",
+    0x0C00: "telugu",
+    0x0C80: "kannada",
+    0x0D00: "malayalam",
+}
+
+# Offsets within a block
+CONSONANTS = dict(zip(range(0x15, 0x3A), [
+    "k", "kh", "g", "gh", "n", "ch", "chh", "j", "jh", "n",
+    "t", "th", "d", "dh", "n", "t", "th", "d", "dh", "n",
+    "n", "p", "ph", "b", "bh", "m", "y", "r", "r", "l",
+    "l", "zh", "v", "sh", "sh", "s", "h",
+]))
+# Precomposed nukta letters (क़ ख़ ग़ ज़ ड़ ढ় फ़ य़)
+CONSONANTS.update({0x58: "q", 0x59: "kh", 0x5A: "gh", 0x5B: "z", 0x5C: "r", 0x5D: "rh", 0x5E: "f", 0x5F: "y"})
+# The same letters written as consonant + nukta sign
+NUKTA_CONSONANTS = {0x15: "q", 0x16: "kh", 0x17: "gh", 0x1C: "z", 0x21: "r", 0x22: "rh", 0x2B: "f", 0x2F: "y"}
+VOWELS = {
+    0x05: "a", 0x06: "aa", 0x07: "i", 0x08: "ii", 0x09: "u", 0x0A: "uu", 0x0B: "ri", 0x0C: "li",
+    0x0D: "e", 0x0E: "e", 0x0F: "e", 0x10: "ai", 0x11: "o", 0x12: "o", 0x13: "o", 0x14: "au",
+    0x60: "rii", 0x61: "lii", 0x50: "om",
+}
+VOWEL_SIGNS = {
+    0x3E: "aa", 0x3F: "i", 0x40: "ii", 0x41: "u", 0x42: "uu", 0x43: "ri", 0x44: "rii",
+    0x45: "e", 0x46: "e", 0x47: "e", 0x48: "ai", 0x49: "o", 0x4A: "o", 0x4B: "o", 0x4C: "au",
+    0x57: "au", 0x62: "li", 0x63: "lii",
+}
+NASALS = {0x01, 0x02, 0x70}  # candrabindu, anusvara, Gurmukhi tippi
+VISARGA = 0x03
+NUKTA = 0x3C
+VIRAMA = 0x4D
+# Letters spelled differently in a script: Tamil ச is usually "s" ("j" after a
+# nasal, மஞ்சள் -> manjal); Bengali ব is "b" but "v" in conjuncts (অশ্ব -> ashva)
+SCRIPT_CONSONANTS = {"tamil": {0x1A: "s"}}
+# offset -> (letter, after these consonants only, or after any)
+CONJUNCT_CONSONANTS = {"tamil": {0x1A: ("j", {"n"})}, "bengali": {0x2C: ("v", None)}}
+# Letters that never carry an inherent vowel
+FINAL_CONSONANTS = {
+    "bengali": {0x4E: "t"},  # khanda ta
+    "malayalam": {0x7A: "n", 0x7B: "n", 0x7C: "r", 0x7D: "l", 0x7E: "l", 0x7F: "k"},  # chillus
+}
+
+# Latin spelling variants folded together, in order
+PHONETIC_RULES = [
+    (re.compile(pattern), replacement) for pattern, replacement in [
+        (r"chh|ch", "c"), (r"sh", "s"), (r"zh", "l"),
+        (r"([kgjtdpbr])h", r"\1"), (r"w", "v"), (r"z", "j"), (r"q", "k"), (r"f", "p"), (r"x", "ks"),
+        (r"ee", "i"), (r"oo", "u"), (r"m(?=[pb])", "n"),
+        (r"([a-z])\1+", r"\1"), (r"[^a-z0-9]", ""),
+    ]
+]
+
+
+def script_of(char: str) -> Optional[str]:
+    return SCRIPT_BLOCKS.get(ord(char) & ~0x7F)
+
+
+def has_indic(text: str) -> bool:
+    return any(script_of(char) for char in text)
+
+
+def _segments(word: str) -> List[list]:
+    """
+    [kind, text] per sound: "C" consonant, "A" inherent vowel, "V" written
+    vowel, "N" nasal, "X" anything outside the Indic blocks
+    """
+    segments = []
+    consonant = None  # block offset of the last consonant, for a following nukta
+    for char in word:
+        script = script_of(char)
+        if script is None:
+            segments.append(["X", char])
+            consonant = None
+            continue
+        offset = ord(char) & 0x7F
+        if offset in FINAL_CONSONANTS.get(script, {}):
+            segments.append(["C", FINAL_CONSONANTS[script][offset]])
+        elif offset in CONSONANTS:
+            letter = SCRIPT_CONSONANTS.get(script, {}).get(offset, CONSONANTS[offset])
+            conjunct = CONJUNCT_CONSONANTS.get(script, {}).get(offset)
+            if conjunct and segments and segments[-1][0] == "C" and (conjunct[1] is None or segments[-1][1] in conjunct[1]):
+                letter = conjunct[0]
+            segments += [["C", letter], ["A", "a"]]
+            consonant = offset
+            continue
+        elif offset == NUKTA and consonant in NUKTA_CONSONANTS:
+            segments[-2][1] = NUKTA_CONSONANTS[consonant]
+        elif offset in VOWEL_SIGNS:
+            if segments and segments[-1][0] == "A":
+                segments[-1] = ["V", VOWEL_SIGNS[offset]]
+            else:
+                segments.append(["V", VOWEL_SIGNS[offset]])
+        elif offset == VIRAMA:
+            if segments and segments[-1][0] == "A":
+                segments.pop()
+        elif offset in VOWELS:
+            segments.append(["V", VOWELS[offset]])
+        elif offset in NASALS:
+            segments.append(["N", "n"])
+        elif offset == VISARGA:
+            segments.append(["C", "h"])
+        elif 0x66 <= offset <= 0x6F:
+            segments.append(["X", str(offset - 0x66)])
+        consonant = None
+    return segments
+
+
+def _delete_schwas(segments: List[list]) -> List[list]:
+    """
+    Drop inherent vowels that aren't pronounced in Hindi and most North
+    Indian languages: word-finally, and between VC_CV (तुलसी -> tulsi)
+    """
+    vowels = [i for i, (kind, _) in enumerate(segments) if kind in "AV"]
+    if len(vowels) < 2:
+        return segments
+    kept = list(segments)
+    if kept[-1][0] == "A":
+        kept.pop()
+
+    def vowel(i):
+        return 0 <= i < len(kept) and kept[i][0] in "AV"
+
+    def consonant(i):
+        return 0 <= i < len(kept) and kept[i][0] in "CN"
+
+    for i in range(len(kept) - 1, -1, -1):
+        if kept[i][0] == "A" and consonant(i - 1) and vowel(i - 2) and consonant(i + 1) and vowel(i + 2):
+            del kept[i]
+    return kept
+
+
+def romanize(text: str, schwa_deletion: bool = False) -> str:
+    """Indic script in `text` spelled in plain Latin letters; other text unchanged"""
+    words = []
+    for word in unicodedata.normalize("NFC", text).split():
+        if not has_indic(word):
+            words.append(word)
+            continue
+        segments = _segments(word)
+        if schwa_deletion:
+            segments = _delete_schwas(segments)
+        words.append("".join(text for _, text in segments))
+    return " ".join(words)
+
+
+def phonetic_key(text: str) -> str:
+    """Loose Latin spelling key: "Tulasii" -> "tulasi", "Ashwagandha" -> "asvaganda" """
+    # Latin diacritics (IAST "Tulasī") are dropped, not the letters carrying them
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not "\u0300" <= c <= "\u036f")
+    words = []
+    for word in text.casefold().split():
+        for pattern, replacement in PHONETIC_RULES:
+            word = pattern.sub(replacement, word)
+        if word:
+            words.append(word)
+    return " ".join(words)
+
+
+def phonetic_keys(text: str) -> List[str]:
+    """Phonetic keys for a name in any supported script, with and without schwa deletion"""
+    keys = [phonetic_key(romanize(text))]
+    if has_indic(text):
+        keys.append(phonetic_key(romanize(text, schwa_deletion=True)))
+    return [key for i, key in enumerate(keys) if key and key not in keys[:i]]
@@ -0,0 +1,93 @@
+"""
+Streaming multipart/form-data reader for binary image uploads.
+The file part is written chunk by chunk into a spooled temp buffer and the
+upload is rejected as soon as it exceeds the size limit.
+"""
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Uploads larger than this spill from memory to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+
+def _too_large(max_bytes: int):
+    return HTTPException(
+        status_code=413,
+        detail=f"Upload exceeds the {max_bytes // (1024 * 1024)}MB limit"
+    )
+
+
+async def read_upload(
+    request: Request,
+    field_name: str = "image",
+    max_bytes: int = MAX_UPLOAD_BYTES
+) -> bytes:
+    """Return the bytes of a single file field from a multipart request body"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=415, detail="Expected multipart/form-data")
+
+    # Cheap early rejection when the client declares the size up front
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + 64 * 1024:
+        raise _too_large(max_bytes)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    state = {"header_field": b"", "header_value": b"", "in_field": False, "found": False, "size": 0}
+
+    def on_part_begin():
+        state["in_field"] = False
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            _, options = parse_options_header(state["header_value"])
+            if options.get(b"name") == field_name.encode() and not state["found"]:
+                state["in_field"] = True
+                state["found"] = True
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_part_data(data, start, end):
+        if not state["in_field"]:
+            return
+        state["size"] += end - start
+        if state["size"] <= max_bytes:
+            spool.write(data[start:end])
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+    })
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if state["size"] > max_bytes:
+                    raise _too_large(max_bytes)
+            parser.finalize()
+        except MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+
+        if not state["found"] or state["size"] == 0:
+            raise HTTPException(status_code=400, detail=f"Missing '{field_name}' file field")
+        spool.seek(0)
+        return spool.read()
+    finally:
+        spool.close()
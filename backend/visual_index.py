@@ -0,0 +1,215 @@
+"""
+CPU-only visual nearest-neighbour search over catalogue plant images.
+Each image becomes a fixed-length feature vector (HSV colour histogram plus a
+coarse histogram of oriented gradients); vectors are stacked into one NumPy
+matrix and a scan is matched by cosine similarity against all of them at once.
+A close enough match identifies the plant without calling the vision model.
+Matching has not been validated against real scans yet, so it is off unless
+VISUAL_MATCH_ENABLED=true, and a visual match alone is never "high" confidence.
+"""
+from PIL import Image, ImageOps, UnidentifiedImageError
+from typing import Dict, List, Optional
+import asyncio
+import io
+import logging
+import os
+import numpy as np
+from dotenv import load_dotenv
+from image_pipeline import run_in_image_pool
+from image_store import load_image
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VISUAL_MATCH_ENABLED = os.getenv("VISUAL_MATCH_ENABLED", "false").lower() == "true"
+# Cosine similarity above which a catalogue image is trusted as the answer
+VISUAL_MATCH_THRESHOLD = float(os.getenv("VISUAL_MATCH_THRESHOLD", "0.93"))
+# ...and by how much it must beat the best image of any other plant
+VISUAL_MATCH_MARGIN = float(os.getenv("VISUAL_MATCH_MARGIN", "0.02"))
+VISUAL_NEIGHBOURS = 5
+
+# Bump when the feature extraction changes so stored vectors are recomputed
+FEATURE_VERSION = 1
+_FEATURE_SIZE = 128
+_HUE_BINS, _SAT_BINS, _VAL_BINS = 8, 4, 4
+_HOG_CELLS, _HOG_BINS = 4, 9
+# Relative weight of shape (gradients) vs colour in the similarity
+_HOG_WEIGHT = 0.7
+
+
+def image_features(image_bytes: bytes) -> Optional[np.ndarray]:
+    """Unit-length float32 feature vector, or None if the image can't be decoded"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            source.draft("RGB", (_FEATURE_SIZE * 2, _FEATURE_SIZE * 2))
+            image = ImageOps.exif_transpose(source).convert("RGB")
+    except (UnidentifiedImageError, OSError):
+        return None
+    image = image.resize((_FEATURE_SIZE, _FEATURE_SIZE), Image.BILINEAR)
+
+    hsv = np.asarray(image.convert("HSV"), dtype=np.int64)
+    bins = (
+        (hsv[..., 0] * _HUE_BINS >> 8) * _SAT_BINS * _VAL_BINS
+        + (hsv[..., 1] * _SAT_BINS >> 8) * _VAL_BINS
+        + (hsv[..., 2] * _VAL_BINS >> 8)
+    )
+    colour = np.bincount(bins.ravel(), minlength=_HUE_BINS * _SAT_BINS * _VAL_BINS)
+    # Square-rooted histograms make the dot product a Hellinger kernel
+    colour = np.sqrt(colour / colour.sum())
+
+    gray = np.asarray(image.convert("L"), dtype=np.float32)
+    gx = np.zeros_like(gray)
+    gy = np.zeros_like(gray)
+    gx[:, 1:-1] = gray[:, 2:] - gray[:, :-2]
+    gy[1:-1, :] = gray[2:, :] - gray[:-2, :]
+    magnitude = np.hypot(gx, gy)
+    orientation = np.minimum(
+        (np.arctan2(gy, gx) % np.pi) * _HOG_BINS / np.pi, _HOG_BINS - 1
+    ).astype(np.int64)
+    cell_size = _FEATURE_SIZE // _HOG_CELLS
+    rows, cols = np.indices(gray.shape) // cell_size
+    cells = (rows * _HOG_CELLS + cols) * _HOG_BINS + orientation
+    shape = np.bincount(
+        cells.ravel(), weights=magnitude.ravel(), minlength=_HOG_CELLS * _HOG_CELLS * _HOG_BINS
+    )
+    shape = np.sqrt(shape / (shape.sum() or 1.0))
+
+    features = np.concatenate([colour, _HOG_WEIGHT * shape]).astype(np.float32)
+    return features / (np.linalg.norm(features) or 1.0)
+
+
+class VisualIndex:
+    fields = ("images",)
+
+    def __init__(self, collection):
+        """`collection` persists feature vectors by image hash across restarts"""
+        self.collection = collection
+        self._plant_images: Dict[str, List[str]] = {}  # plant_id -> thumbnail hashes
+        self._features: Dict[str, Optional[np.ndarray]] = {}  # image hash -> vector
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._owners = np.zeros(0, dtype=object)
+        self._sync_task = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def rebuild(self, plants: List[dict]):
+        self._plant_images = {}
+        for plant in plants:
+            self._set_images(plant)
+        self._schedule_sync()
+
+    def add(self, plant: dict):
+        self._set_images(plant)
+        self._schedule_sync()
+
+    def _set_images(self, plant: dict):
+        hashes = [refs["thumbnail"] for refs in plant.get("images") or [] if refs.get("thumbnail")]
+        plant_id = str(plant["_id"])
+        if hashes:
+            self._plant_images[plant_id] = hashes
+        else:
+            self._plant_images.pop(plant_id, None)
+
+    def _schedule_sync(self):
+        # Feature extraction runs in the background; searches use the last matrix
+        self._dirty = True
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self._sync())
+
+    async def _sync(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await self._load_missing_features()
+            except Exception:
+                logger.exception("Visual index update failed")
+            self._build_matrix()
+
+    async def _load_missing_features(self):
+        wanted = {h for hashes in self._plant_images.values() for h in hashes}
+        # Drop vectors of images no longer referenced by any plant
+        for image_hash in self._features.keys() - wanted:
+            del self._features[image_hash]
+        missing = wanted - self._features.keys()
+        if not missing:
+            return
+        async for doc in self.collection.find(
+            {"_id": {"$in": list(missing)}, "version": FEATURE_VERSION}
+        ):
+            self._features[doc["_id"]] = np.frombuffer(doc["vector"], dtype=np.float32)
+            missing.discard(doc["_id"])
+        for image_hash in missing:
+            image_bytes = await load_image(image_hash)
+            vector = await run_in_image_pool(image_features, image_bytes) if image_bytes else None
+            self._features[image_hash] = vector
+            if vector is not None:
+                await self.collection.replace_one(
+                    {"_id": image_hash},
+                    {"vector": vector.tobytes(), "version": FEATURE_VERSION},
+                    upsert=True
+                )
+
+    def _build_matrix(self):
+        rows, owners = [], []
+        for plant_id, hashes in self._plant_images.items():
+            for image_hash in hashes:
+                vector = self._features.get(image_hash)
+                if vector is not None:
+                    rows.append(vector)
+                    owners.append(plant_id)
+        self._matrix = np.vstack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+        self._owners = np.array(owners, dtype=object)
+
+    def search(self, features: np.ndarray, k: int = VISUAL_NEIGHBOURS) -> List[dict]:
+        """Nearest catalogue images as [{"plant_id", "similarity"}], best first"""
+        matrix, owners = self._matrix, self._owners
+        if not len(owners):
+            return []
+        similarities = matrix @ features
+        k = min(k, len(owners))
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        nearest = nearest[np.argsort(-similarities[nearest])]
+        return [
+            {"plant_id": owners[i], "similarity": round(float(similarities[i]), 4)}
+            for i in nearest
+        ]
+
+    async def match(
+        self, image_bytes: bytes,
+        threshold: float = VISUAL_MATCH_THRESHOLD, margin: float = VISUAL_MATCH_MARGIN
+    ) -> Optional[dict]:
+        """
+        The catalogue plant an image clearly shows, as {"plant_id",
+        "similarity", "confidence", "neighbours"}, or None
+        """
+        if not len(self._owners):
+            return None
+        features = await run_in_image_pool(image_features, image_bytes)
+        if features is None:
+            return None
+        neighbours = self.search(features)
+        best = neighbours[0]
+        runner_up = next(
+            (n["similarity"] for n in neighbours if n["plant_id"] != best["plant_id"]), 0.0
+        )
+        if best["similarity"] < threshold or best["similarity"] - runner_up < margin:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            **best,
+            "confidence": "medium",
+            "neighbours": neighbours
+        }
+
+    def stats(self) -> dict:
+        return {
+            "enabled": VISUAL_MATCH_ENABLED,
+            "plants": len(self._plant_images),
+            "images": len(self._owners),
+            "updating": self._sync_task is not None and not self._sync_task.done(),
+            "hits": self.hits,
+            "misses": self.misses
+        }
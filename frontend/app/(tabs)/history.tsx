@@ -11,14 +11,14 @@ import {
 } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { useRouter } from 'expo-router';
-import api from '../../utils/api';
+import api, { resolveImageUrl } from '../../utils/api';
 
 interface Scan {
   _id: string;
   identified_plant_name: string;
   confidence: string;
   timestamp: string;
-  scanned_image_base64: string;
+  thumbnail_url?: string;
 }
 
 export default function HistoryScreen() {
@@ -26,6 +26,8 @@ export default function HistoryScreen() {
   const [scans, setScans] = useState<Scan[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchHistory();
@@ -36,6 +38,7 @@ export default function HistoryScreen() {
       setLoading(true);
       const response = await api.get('/api/scans/history');
       setScans(response.data.scans);
+      setNextCursor(response.data.next_cursor);
     } catch (error: any) {
       Alert.alert('Error', 'Failed to load scan history');
     } finally {
@@ -44,6 +47,22 @@ export default function HistoryScreen() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const response = await api.get('/api/scans/history', {
+        params: { cursor: nextCursor },
+      });
+      setScans((current) => [...current, ...response.data.scans]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error: any) {
+      // Scrolling further retries the same page
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleRefresh = () => {
     setRefreshing(true);
     fetchHistory();
@@ -56,10 +75,14 @@ export default function HistoryScreen() {
 
   const renderScanItem = ({ item }: { item: Scan }) => (
     <View style={styles.scanCard}>
-      <Image
-        source={{ uri: `data:image/jpeg;base64,${item.scanned_image_base64}` }}
-        style={styles.scanImage}
-      />
+      {item.thumbnail_url ? (
+        <Image
+          source={{ uri: resolveImageUrl(item.thumbnail_url) }}
+          style={styles.scanImage}
+        />
+      ) : (
+        <View style={styles.scanImage} />
+      )}
       <View style={styles.scanInfo}>
         <Text style={styles.plantName}>{item.identified_plant_name}</Text>
         <View style={styles.confidenceBadge}>
@@ -100,6 +123,11 @@ export default function HistoryScreen() {
           contentContainerStyle={styles.listContent}
           refreshing={refreshing}
           onRefresh={handleRefresh}
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={
+            loadingMore ? <ActivityIndicator style={styles.footer} color="#4CAF50" /> : null
+          }
         />
       )}
     </SafeAreaView>
@@ -111,6 +139,9 @@ const styles = StyleSheet.create({
     flex: 1,
     backgroundColor: '#f5f5f5',
   },
+  footer: {
+    marginVertical: 16,
+  },
   centerContainer: {
     flex: 1,
     justifyContent: 'center',
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   View,
   Text,
@@ -12,7 +12,7 @@ import {
 } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { useRouter } from 'expo-router';
-import api from '../../utils/api';
+import api, { resolveImageUrl } from '../../utils/api';
 
 interface Plant {
   _id: string;
@@ -20,26 +20,100 @@ interface Plant {
   scientific_name: string;
   family: string;
   description: string;
-  thumbnail?: string;
+  thumbnail_url?: string;
 }
 
+interface Suggestion {
+  _id: string;
+  name: string;
+  matched_name: string;
+}
+
+// Wait for a pause in typing before asking for suggestions
+const SUGGEST_DELAY_MS = 150;
+
 export default function HomeScreen() {
   const router = useRouter();
   const [plants, setPlants] = useState<Plant[]>([]);
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
   const [refreshing, setRefreshing] = useState(false);
+  const [didYouMean, setDidYouMean] = useState<string | null>(null);
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // The search the listed plants belong to; the cursor is only valid for it
+  const [listedSearch, setListedSearch] = useState('');
+  const suggestTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const suggestRequest = useRef(0);
 
   useEffect(() => {
     fetchPlants();
+    return () => {
+      if (suggestTimer.current) clearTimeout(suggestTimer.current);
+    };
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const params = listedSearch
+        ? { search: listedSearch, cursor: nextCursor, limit: 50 }
+        : { cursor: nextCursor, limit: 50 };
+      const response = await api.get('/api/plants', { params });
+      setPlants((current) => [...current, ...response.data.plants]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error: any) {
+      // Scrolling further retries the same page
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const fetchSuggestions = async (query: string) => {
+    const request = ++suggestRequest.current;
+    try {
+      const response = await api.get('/api/plants/suggest', { params: { q: query } });
+      // Drop answers to keystrokes the user has already typed past
+      if (request === suggestRequest.current) {
+        setSuggestions(response.data.suggestions);
+      }
+    } catch (error) {
+      // Suggestions are best-effort; the full search still works on submit
+    }
+  };
+
+  const clearSuggestions = () => {
+    if (suggestTimer.current) clearTimeout(suggestTimer.current);
+    suggestRequest.current++;
+    setSuggestions([]);
+  };
+
+  const handleChangeText = (text: string) => {
+    setSearchQuery(text);
+    if (suggestTimer.current) clearTimeout(suggestTimer.current);
+    if (!text.trim()) {
+      clearSuggestions();
+      return;
+    }
+    suggestTimer.current = setTimeout(() => fetchSuggestions(text), SUGGEST_DELAY_MS);
+  };
+
+  const handleSelectSuggestion = (item: Suggestion) => {
+    clearSuggestions();
+    router.push(`/plant/${item._id}`);
+  };
+
   const fetchPlants = async (search?: string) => {
     try {
       setLoading(true);
       const params = search ? { search, limit: 50 } : { limit: 50 };
       const response = await api.get('/api/plants', { params });
       setPlants(response.data.plants);
+      setListedSearch(search || '');
+      setNextCursor(response.data.next_cursor);
+      setDidYouMean(response.data.did_you_mean || null);
     } catch (error: any) {
       Alert.alert('Error', 'Failed to load plants');
     } finally {
@@ -49,6 +123,7 @@ export default function HomeScreen() {
   };
 
   const handleSearch = () => {
+    clearSuggestions();
     if (searchQuery.trim()) {
       fetchPlants(searchQuery);
     } else {
@@ -56,9 +131,17 @@ export default function HomeScreen() {
     }
   };
 
+  const handleSuggestion = () => {
+    if (didYouMean) {
+      setSearchQuery(didYouMean);
+      fetchPlants(didYouMean);
+    }
+  };
+
   const handleRefresh = () => {
     setRefreshing(true);
     setSearchQuery('');
+    clearSuggestions();
     fetchPlants();
   };
 
@@ -67,9 +150,9 @@ export default function HomeScreen() {
       style={styles.plantCard}
       onPress={() => router.push(`/plant/${item._id}`)}
     >
-      {item.thumbnail ? (
+      {item.thumbnail_url ? (
         <Image
-          source={{ uri: `data:image/jpeg;base64,${item.thumbnail}` }}
+          source={{ uri: resolveImageUrl(item.thumbnail_url) }}
           style={styles.plantImage}
         />
       ) : (
@@ -95,7 +178,7 @@ export default function HomeScreen() {
           style={styles.searchInput}
           placeholder="Search plants..."
           value={searchQuery}
-          onChangeText={setSearchQuery}
+          onChangeText={handleChangeText}
           onSubmitEditing={handleSearch}
           returnKeyType="search"
         />
@@ -104,6 +187,31 @@ export default function HomeScreen() {
         </TouchableOpacity>
       </View>
 
+      {suggestions.length > 0 && (
+        <View style={styles.suggestList}>
+          {suggestions.map((item) => (
+            <TouchableOpacity
+              key={item._id}
+              style={styles.suggestItem}
+              onPress={() => handleSelectSuggestion(item)}
+            >
+              <Text style={styles.suggestName}>{item.matched_name}</Text>
+              {item.matched_name !== item.name && (
+                <Text style={styles.suggestPlant}>{item.name}</Text>
+              )}
+            </TouchableOpacity>
+          ))}
+        </View>
+      )}
+
+      {didYouMean && !loading && (
+        <TouchableOpacity style={styles.suggestion} onPress={handleSuggestion}>
+          <Text style={styles.suggestionText}>
+            Did you mean <Text style={styles.suggestionTerm}>{didYouMean}</Text>?
+          </Text>
+        </TouchableOpacity>
+      )}
+
       {loading ? (
         <View style={styles.centerContainer}>
           <ActivityIndicator size="large" color="#4CAF50" />
@@ -125,6 +233,11 @@ export default function HomeScreen() {
           contentContainerStyle={styles.listContent}
           refreshing={refreshing}
           onRefresh={handleRefresh}
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={
+            loadingMore ? <ActivityIndicator style={styles.footer} color="#4CAF50" /> : null
+          }
         />
       )}
     </SafeAreaView>
@@ -161,11 +274,45 @@ const styles = StyleSheet.create({
   searchButtonText: {
     fontSize: 20,
   },
+  suggestList: {
+    backgroundColor: '#fff',
+    borderBottomWidth: 1,
+    borderBottomColor: '#ddd',
+  },
+  suggestItem: {
+    flexDirection: 'row',
+    justifyContent: 'space-between',
+    paddingHorizontal: 16,
+    paddingVertical: 12,
+  },
+  suggestName: {
+    fontSize: 16,
+    color: '#333',
+  },
+  suggestPlant: {
+    fontSize: 14,
+    color: '#999',
+  },
+  footer: {
+    marginVertical: 16,
+  },
   centerContainer: {
     flex: 1,
     justifyContent: 'center',
     alignItems: 'center',
   },
+  suggestion: {
+    paddingHorizontal: 16,
+    paddingBottom: 8,
+  },
+  suggestionText: {
+    fontSize: 14,
+    color: '#666',
+  },
+  suggestionTerm: {
+    color: '#4CAF50',
+    fontWeight: 'bold',
+  },
   emptyText: {
     fontSize: 18,
     color: '#999',
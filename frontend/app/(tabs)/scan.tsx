@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   View,
   Text,
@@ -15,6 +15,9 @@ import * as ImagePicker from 'expo-image-picker';
 import { useRouter, useLocalSearchParams } from 'expo-router';
 import api from '../../utils/api';
 
+// Retries while the server is still processing an earlier attempt
+const MAX_IN_PROGRESS_RETRIES = 10;
+
 export default function ScanScreen() {
   const router = useRouter();
   const [image, setImage] = useState<string | null>(null);
@@ -22,11 +25,19 @@ export default function ScanScreen() {
   const [result, setResult] = useState<any>(null);
   const [hasPermission, setHasPermission] = useState(false);
   const params = useLocalSearchParams();
+  // One key per photo, so retrying after a timeout replays the original result
+  const idempotencyKey = useRef<string | null>(null);
 
   useEffect(() => {
     requestPermissions();
   }, []);
 
+  useEffect(() => {
+    idempotencyKey.current = image
+      ? `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+      : null;
+  }, [image]);
+
   useEffect(() => {
     // Handle image captured from live camera
     if (params.capturedImage && typeof params.capturedImage === 'string') {
@@ -106,6 +117,25 @@ export default function ScanScreen() {
     }
   };
 
+  // A 409 means an earlier attempt with this key is still running on the
+  // server; wait for it instead of showing an error
+  const postIdentify = async (attempt = 0): Promise<any> => {
+    try {
+      return await api.post(
+        '/api/plants/identify',
+        { image_base64: image },
+        { headers: { 'Idempotency-Key': idempotencyKey.current } }
+      );
+    } catch (error: any) {
+      if (error.response?.status !== 409 || attempt >= MAX_IN_PROGRESS_RETRIES) {
+        throw error;
+      }
+      const retryAfter = Number(error.response.headers?.['retry-after']) || 1;
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      return postIdentify(attempt + 1);
+    }
+  };
+
   const identifyPlant = async () => {
     if (!image) {
       Alert.alert('Error', 'Please select an image first');
@@ -114,9 +144,7 @@ export default function ScanScreen() {
 
     try {
       setLoading(true);
-      const response = await api.post('/api/plants/identify', {
-        image_base64: image,
-      });
+      const response = await postIdentify();
       setResult(response.data);
     } catch (error: any) {
       Alert.alert(
@@ -10,7 +10,7 @@ import {
 } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { useLocalSearchParams, Stack } from 'expo-router';
-import api from '../../utils/api';
+import api, { resolveImageUrl } from '../../utils/api';
 
 interface PlantDetails {
   _id: string;
@@ -22,7 +22,7 @@ interface PlantDetails {
   medicinal_properties: string[];
   uses: string[];
   parts_used: string[];
-  images_base64: string[];
+  image_urls: string[];
 }
 
 export default function PlantDetailsScreen() {
@@ -80,17 +80,17 @@ export default function PlantDetailsScreen() {
         }} 
       />
       <ScrollView contentContainerStyle={styles.scrollContent}>
-        {plant.images_base64 && plant.images_base64.length > 0 ? (
+        {plant.image_urls && plant.image_urls.length > 0 ? (
           <ScrollView
             horizontal
             pagingEnabled
             showsHorizontalScrollIndicator
             style={styles.imageScroll}
           >
-            {plant.images_base64.map((image, index) => (
+            {plant.image_urls.map((url, index) => (
               <Image
                 key={index}
-                source={{ uri: `data:image/jpeg;base64,${image}` }}
+                source={{ uri: resolveImageUrl(url) }}
                 style={styles.plantImage}
               />
             ))}
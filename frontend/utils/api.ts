@@ -23,4 +23,7 @@ api.interceptors.request.use(
   }
 );
 
+// Images are served by the backend image store as relative /api/images URLs
+export const resolveImageUrl = (path: string) => `${BACKEND_URL}${path}`;
+
 export default api;
\ No newline at end of file
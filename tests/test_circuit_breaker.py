@@ -0,0 +1,217 @@
+import asyncio
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+class Upstream(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_FAILURE_RATE", 0.5)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_OPEN_SECONDS", 30)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_HALF_OPEN_PROBES", 2)
+
+
+def breaker():
+    return CircuitBreaker(is_failure=lambda error: isinstance(error, Upstream))
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise Upstream("503")
+
+
+async def outcome(breaker, func):
+    try:
+        return await breaker.call(func)
+    except (Upstream, BadRequest, CircuitOpen) as e:
+        return type(e).__name__
+
+
+def run(breaker, *funcs):
+    async def calls():
+        return [await outcome(breaker, func) for func in funcs]
+    return asyncio.run(calls())
+
+
+def trip(breaker, monkeypatch):
+    run(breaker, succeed, fail, succeed, fail)
+    assert breaker.state == OPEN
+    # Cool-down elapsed
+    monkeypatch.setattr(circuit_breaker, "BREAKER_OPEN_SECONDS", 0)
+
+
+def test_opens_at_failure_rate_once_window_has_min_calls():
+    cb = breaker()
+    run(cb, fail, fail, fail)
+    assert cb.state == CLOSED
+    assert run(cb, succeed) == ["ok"]
+    assert cb.state == OPEN
+
+
+def test_non_provider_errors_do_not_count():
+    async def bad_request():
+        raise BadRequest("400")
+
+    cb = breaker()
+    assert run(cb, *[bad_request] * 5) == ["BadRequest"] * 5
+    assert cb.state == CLOSED
+    assert cb.stats()["failure_rate"] == 0
+
+
+def test_open_circuit_rejects_without_calling():
+    called = []
+
+    async def tracked():
+        called.append(True)
+
+    cb = breaker()
+    run(cb, fail, fail, fail, fail)
+    assert run(cb, tracked) == ["CircuitOpen"]
+    with pytest.raises(CircuitOpen):
+        cb.check()
+    assert not called
+    assert cb.is_open()
+    assert cb.stats()["rejected"] == 2
+
+
+def test_half_open_closes_after_successful_probes(monkeypatch):
+    cb = breaker()
+    trip(cb, monkeypatch)
+    assert not cb.is_open()
+    assert run(cb, succeed) == ["ok"]
+    assert cb.state == HALF_OPEN
+    assert run(cb, succeed) == ["ok"]
+    assert cb.state == CLOSED
+    assert [(t["from"], t["to"]) for t in cb.stats()["transitions"]] == [
+        (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)
+    ]
+
+
+def test_failed_probe_reopens(monkeypatch):
+    cb = breaker()
+    trip(cb, monkeypatch)
+    assert run(cb, succeed, fail) == ["ok", "Upstream"]
+    assert cb.state == OPEN
+
+
+def test_half_open_admits_only_probe_budget(monkeypatch):
+    async def scenario(cb):
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "ok"
+
+        probes = [asyncio.create_task(outcome(cb, slow)) for _ in range(2)]
+        await asyncio.sleep(0)
+        extra = await outcome(cb, succeed)
+        release.set()
+        return await asyncio.gather(*probes), extra
+
+    cb = breaker()
+    trip(cb, monkeypatch)
+    probes, extra = asyncio.run(scenario(cb))
+    assert probes == ["ok", "ok"]
+    assert extra == "CircuitOpen"
+    assert cb.state == CLOSED
+
+
+def test_cancelled_probe_frees_its_slot(monkeypatch):
+    async def scenario(cb):
+        probe = asyncio.create_task(cb.call(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    cb = breaker()
+    trip(cb, monkeypatch)
+    asyncio.run(scenario(cb))
+    assert cb.state == HALF_OPEN
+    assert run(cb, succeed, succeed) == ["ok", "ok"]
+    assert cb.state == CLOSED
+
+
+def test_identifier_records_upstream_time_not_queue_wait(monkeypatch):
+    from identification_backends import IdentificationBackend
+    from plant_identifier import PlantIdentifier
+
+    monkeypatch.setattr(circuit_breaker, "BREAKER_MIN_CALLS", 1)
+
+    class Fast(IdentificationBackend):
+        async def complete(self, image_base64, prompt):
+            return '{"plant_name": "Neem"}'
+
+    async def scenario(identifier):
+        async def busy():
+            async with identifier.scheduler.slot():
+                await asyncio.sleep(0.1)
+
+        holder = asyncio.create_task(busy())
+        await asyncio.sleep(0)
+        result = await identifier.identify("image")
+        await holder
+        return result
+
+    identifier = PlantIdentifier(backend=Fast(), pool_size=1, hedge=False, slow_call_seconds=0.05)
+    assert asyncio.run(scenario(identifier))["data"] == {"plant_name": "Neem"}
+    assert identifier.breaker.state == CLOSED
+    assert identifier.breaker.stats()["slow_call_rate"] == 0
+
+
+def test_identifier_opens_on_slow_successful_calls(monkeypatch):
+    from identification_backends import IdentificationBackend
+    from plant_identifier import PlantIdentifier
+
+    monkeypatch.setattr(circuit_breaker, "BREAKER_SLOW_CALL_RATE", 0.8)
+
+    class Slow(IdentificationBackend):
+        calls = 0
+
+        async def complete(self, image_base64, prompt):
+            self.calls += 1
+            await asyncio.sleep(0.06)
+            return '{"plant_name": "Neem"}'
+
+    async def scenario(identifier):
+        results = [await identifier.identify("image") for _ in range(4)]
+        with pytest.raises(CircuitOpen):
+            await identifier.identify("image")
+        return results
+
+    backend = Slow()
+    identifier = PlantIdentifier(backend=backend, attempt_timeout=1, hedge=False, slow_call_seconds=0.05)
+    results = asyncio.run(scenario(identifier))
+    assert all(result["success"] for result in results)
+    assert identifier.breaker.state == OPEN
+    assert identifier.breaker.transitions[-1]["reason"] == "slow call rate 100%"
+    assert backend.calls == 4
+
+
+def test_identifier_rejects_slow_threshold_at_or_above_attempt_timeout():
+    from identification_backends import IdentificationBackend
+    from plant_identifier import PlantIdentifier
+
+    class Unused(IdentificationBackend):
+        async def complete(self, image_base64, prompt):
+            raise AssertionError("not called")
+
+    with pytest.raises(ValueError):
+        PlantIdentifier(backend=Unused(), attempt_timeout=20, slow_call_seconds=20)
+    # The default threshold is below the default attempt timeout only
+    with pytest.raises(ValueError):
+        PlantIdentifier(backend=Unused(), attempt_timeout=10)
+    PlantIdentifier(backend=Unused())
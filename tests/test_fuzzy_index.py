@@ -0,0 +1,78 @@
+from fuzzy_index import FuzzyIndex, deletes, max_distance
+
+PLANTS = [
+    {"_id": "neem", "name": "Neem", "scientific_name": "Azadirachta indica"},
+    {"_id": "ashwagandha", "name": "Ashwagandha", "scientific_name": "Withania somnifera"},
+    {"_id": "tulsi", "name": "Holy Basil", "sanskrit_name": "Tulasi", "scientific_name": "Ocimum tenuiflorum"},
+    {"_id": "basil", "name": "Sweet Basil", "scientific_name": "Ocimum basilicum"},
+]
+
+
+def index():
+    fuzzy = FuzzyIndex()
+    fuzzy.rebuild(PLANTS)
+    return fuzzy
+
+
+def test_allowed_distance_grows_with_word_length():
+    assert max_distance("tea") == 0
+    assert max_distance("neam") == 1
+    assert max_distance("ashwagandha") == 2
+
+
+def test_deletes_cover_the_prefix_only():
+    assert deletes("neem", 1) == {"neem", "eem", "nem", "nee"}
+    assert "ashwaga" in deletes("ashwagandha", 2)
+    assert all(len(variant) >= 5 for variant in deletes("ashwagandha", 2))
+
+
+def test_one_edit():
+    fuzzy = index()
+    assert fuzzy.lookup("neam") == [("neem", 1)]
+    assert fuzzy.search("neam") == (["neem"], "neem")
+
+
+def test_two_edits_on_long_words():
+    fuzzy = index()
+    assert fuzzy.lookup("aswaganda") == [("ashwagandha", 2)]
+    assert fuzzy.search("aswaganda") == (["ashwagandha"], "ashwagandha")
+
+
+def test_too_many_edits_find_nothing():
+    fuzzy = index()
+    assert fuzzy.lookup("nxxm") == []
+    assert fuzzy.search("nxxm") == ([], None)
+
+
+def test_short_words_must_match_exactly():
+    fuzzy = index()
+    fuzzy.add({"_id": "tea", "name": "Tea"})
+    assert fuzzy.lookup("tea") == [("tea", 0)]
+    assert fuzzy.lookup("tae") == []
+
+
+def test_exact_query_has_no_suggestion():
+    assert index().search("neem") == (["neem"], None)
+
+
+def test_did_you_mean_corrects_every_word():
+    plant_ids, did_you_mean = index().search("swet basl")
+    assert plant_ids == ["basil"]
+    assert did_you_mean == "sweet basil"
+
+
+def test_closer_matches_rank_first():
+    fuzzy = index()
+    fuzzy.add({"_id": "ashvagandha", "name": "Ashvagandha"})
+    assert fuzzy.lookup("ashwaganda") == [("ashwagandha", 1), ("ashvagandha", 2)]
+    assert fuzzy.search("ashwaganda")[0] == ["ashwagandha", "ashvagandha"]
+
+
+def test_remove_drops_deletes_of_unshared_words():
+    fuzzy = index()
+    fuzzy.remove("neem")
+    assert fuzzy.lookup("neam") == []
+    assert "nem" not in fuzzy._deletes
+    # "basil" is still indexed for Holy Basil
+    fuzzy.remove("basil")
+    assert fuzzy.search("basl") == (["tulsi"], "basil")
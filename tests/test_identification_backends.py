@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from identification_backends import IdentificationBackend
+
+
+def test_backend_without_complete_fails_at_construction():
+    class Incomplete(IdentificationBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    with pytest.raises(TypeError):
+        IdentificationBackend()
+
+
+def test_default_stream_yields_the_whole_response():
+    class Echo(IdentificationBackend):
+        async def complete(self, image_base64, prompt):
+            return f"{prompt}:{image_base64}"
+
+    async def chunks():
+        return [chunk async for chunk in Echo().stream("image", "prompt")]
+
+    assert asyncio.run(chunks()) == ["prompt:image"]
@@ -0,0 +1,46 @@
+import base64
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("position", [
+    {"id": "65f1c2a4e4b0a1b2c3d4e5f6"},
+    {"timestamp": "2024-03-01T12:30:00.123456", "id": "65f1c2a4e4b0a1b2c3d4e5f6"},
+    {"timestamp": None, "id": "65f1c2a4e4b0a1b2c3d4e5f6"},
+    {"search": "तुलसी", "offset": 40},
+])
+def test_round_trip(position):
+    assert decode_cursor(encode_cursor(position)) == position
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor({"search": "??>>", "offset": 1})
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def encoded(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "zzz",
+    "not a cursor!",
+    "é",
+    encoded(b"not json"),
+    encoded(b"\xff\xfe"),
+    encoded(b"[1, 2]"),
+    encoded(b"42"),
+    encoded(b'"id"'),
+    encoded(b"null"),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_invalid_cursor_is_a_value_error():
+    assert issubclass(InvalidCursor, ValueError)
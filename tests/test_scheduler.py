@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from scheduler import BACKGROUND, BATCH, INTERACTIVE, PriorityScheduler, QueueFull
+
+
+async def hold(scheduler, priority, release, order, label):
+    async with scheduler.slot(priority):
+        order.append(label)
+        await release.wait()
+
+
+async def settle():
+    # Let every started task run up to its first blocking await
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def scenario():
+        scheduler = PriorityScheduler(concurrency=1, max_queue=10)
+        release = asyncio.Event()
+        order = []
+        blocker = asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, INTERACTIVE, blocker, order, "first"))
+        await settle()
+        tasks = [
+            asyncio.create_task(hold(scheduler, priority, release, order, label))
+            for priority, label in [
+                (BACKGROUND, "background"), (BATCH, "batch-1"),
+                (INTERACTIVE, "interactive"), (BATCH, "batch-2"),
+            ]
+        ]
+        await settle()
+        assert scheduler.stats()["waiting"] == {"interactive": 1, "batch": 2, "background": 1}
+        release.set()
+        blocker.set()
+        await asyncio.gather(first, *tasks)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["first", "interactive", "batch-1", "batch-2", "background"]
+    assert scheduler.active == 0
+
+
+def test_full_queue_rejects_interactive_and_batch_but_not_background():
+    async def scenario():
+        scheduler = PriorityScheduler(concurrency=1, max_queue=1)
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(hold(scheduler, INTERACTIVE, release, order, label)) for label in "ab"]
+        await settle()
+        for priority in (INTERACTIVE, BATCH):
+            with pytest.raises(QueueFull) as rejected:
+                await scheduler.run(asyncio.sleep, 0, priority=priority)
+            assert rejected.value.retry_after >= 1
+        background = asyncio.create_task(hold(scheduler, BACKGROUND, release, order, "background"))
+        await settle()
+        assert scheduler.waiting() == 2
+        release.set()
+        await asyncio.gather(*tasks, background)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["a", "b", "background"]
+    assert scheduler.rejected == {"interactive": 1, "batch": 1, "background": 0}
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        scheduler = PriorityScheduler(concurrency=1, max_queue=10)
+        release = asyncio.Event()
+        order = []
+        first = asyncio.create_task(hold(scheduler, INTERACTIVE, release, order, "first"))
+        await settle()
+        cancelled = asyncio.create_task(hold(scheduler, INTERACTIVE, release, order, "cancelled"))
+        later = asyncio.create_task(hold(scheduler, BATCH, release, order, "later"))
+        await settle()
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(first, later)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["first", "later"]
+    assert scheduler.active == 0
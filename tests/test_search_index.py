@@ -0,0 +1,76 @@
+from search_index import SearchIndex
+
+PLANTS = [
+    {"_id": "tulsi", "name": "Tulsi", "sanskrit_name": "Tulasi", "scientific_name": "Ocimum tenuiflorum",
+     "family": "Lamiaceae", "uses": ["Cough", "Fever"]},
+    {"_id": "basil", "name": "Sweet Basil", "scientific_name": "Ocimum basilicum", "family": "Lamiaceae",
+     "uses": ["Digestion"]},
+    {"_id": "neem", "name": "Neem", "sanskrit_name": "Nimba", "scientific_name": "Azadirachta indica",
+     "family": "Meliaceae", "uses": ["Skin disorders", "Fever"]},
+    {"_id": "turmeric", "name": "Turmeric", "sanskrit_name": "Haridra", "scientific_name": "Curcuma longa",
+     "family": "Zingiberaceae", "uses": ["Inflammation"]},
+]
+
+
+def index(plants=PLANTS):
+    search = SearchIndex()
+    search.rebuild(plants)
+    return search
+
+
+def test_exact_name():
+    assert index().search("neem") == ["neem"]
+
+
+def test_last_word_matches_as_prefix():
+    search = index()
+    assert search.search("tur") == ["turmeric"]
+    assert search.search("ocim") == ["basil", "tulsi"]
+    assert set(search.search("ocimum ba")) == {"basil"}
+
+
+def test_short_inner_words_do_not_expand():
+    # "sw" is not the last word, so it must match a term exactly
+    assert index().search("sw basil") == []
+
+
+def test_every_token_must_match():
+    search = index()
+    assert search.search("fever") == ["neem", "tulsi"]
+    assert search.search("fever neem") == ["neem"]
+    assert search.search("fever digestion") == []
+
+
+def test_ties_are_ordered_by_name():
+    # Same field, same weight: "sweet basil" sorts before "tulsi"
+    assert index().search("lamiaceae") == ["basil", "tulsi"]
+
+
+def test_name_matches_rank_above_other_fields():
+    search = index()
+    search.add({"_id": "holy-basil", "name": "Holy Basil", "uses": ["Tulsi tea"]})
+    assert search.search("tulsi") == ["tulsi", "holy-basil"]
+
+
+def test_spelling_variants_meet_at_phonetic_keys():
+    search = index()
+    assert search.search("hareedra") == ["turmeric"]
+    assert search.search("तुलसी") == ["tulsi"]
+
+
+def test_case_and_punctuation_are_normalized():
+    assert index().search("  NEEM!! ") == ["neem"]
+
+
+def test_empty_query():
+    assert index().search("") == []
+
+
+def test_add_and_remove_keep_prefix_ranges_in_sync():
+    search = index()
+    search.add({"_id": "tulip", "name": "Tulip"})
+    assert set(search.search("tul")) == {"tulsi", "tulip"}
+    search.remove("tulip")
+    assert search.search("tul") == ["tulsi"]
+    assert search.search("tulip") == []
+    assert search.stats()["plants"] == len(PLANTS)
@@ -0,0 +1,67 @@
+from streaming_json import IncrementalJSONObjectParser
+from plant_identifier import parse_identification_response
+
+
+def parse(*chunks):
+    parser = IncrementalJSONObjectParser()
+    members = []
+    for chunk in chunks:
+        members += parser.feed(chunk)
+    return parser, members
+
+
+def test_fenced_object():
+    parser, members = parse('```json\n{"plant_name": "Neem", "confidence": "high"}\n```')
+    assert parser.complete
+    assert parser.fields == {"plant_name": "Neem", "confidence": "high"}
+    assert members == [("plant_name", "Neem"), ("confidence", "high")]
+
+
+def test_prose_prefixed_object():
+    parser, _ = parse('Here is the result: {"plant_name": "Tulsi"}')
+    assert parser.complete
+    assert parser.fields == {"plant_name": "Tulsi"}
+
+
+def test_members_emitted_as_chunks_complete_them():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"plant_name": "Ne') == []
+    assert parser.feed('em", "uses": ["a", "b"],') == [("plant_name", "Neem"), ("uses", ["a", "b"])]
+    assert not parser.complete
+    assert parser.feed(' "confidence": "low"}') == [("confidence", "low")]
+    assert parser.complete
+
+
+def test_escaped_quotes_and_braces_in_strings():
+    parser, _ = parse(r'{"description": "Called \"holy basil\" {sacred}, not }", "confidence": "medium"}')
+    assert parser.complete
+    assert parser.fields == {"description": 'Called "holy basil" {sacred}, not }', "confidence": "medium"}
+
+
+def test_truncated_object_is_incomplete():
+    parser, members = parse('{"plant_name": "Neem", "description": "A tree wi')
+    assert not parser.complete
+    assert members == [("plant_name", "Neem")]
+
+
+def test_braced_prose_before_object_is_skipped():
+    parser, _ = parse('I think {maybe} it is: {"plant_name": "Neem"}')
+    assert parser.complete
+    assert parser.fields == {"plant_name": "Neem"}
+
+
+def test_empty_object_is_skipped():
+    parser, _ = parse('{} {"plant_name": "Neem"}')
+    assert parser.fields == {"plant_name": "Neem"}
+
+
+def test_invalid_object_members_are_not_emitted():
+    parser, members = parse('{"plant_name": "X", oops} {"plant_name": "Neem"}')
+    assert parser.fields == {"plant_name": "Neem"}
+    assert members == [("plant_name", "Neem")]
+
+
+def test_response_without_object_falls_back_to_text():
+    result = parse_identification_response("I think {maybe} it is neem")
+    assert result["data"]["plant_name"] == "Unknown"
+    assert result["data"]["description"] == "I think {maybe} it is neem"
@@ -0,0 +1,72 @@
+from suggest_index import SuggestIndex
+
+PLANTS = [
+    {"_id": "basil", "name": "Sweet Basil"},
+    {"_id": "tulsi", "name": "Holy Basil", "sanskrit_name": "Tulasi",
+     "vernacular_names": {"hindi": "तुलसी", "tamil": ["துளசி"]}},
+    {"_id": "bael", "name": "Bael", "sanskrit_name": "Bilva"},
+    {"_id": "bakuchi", "name": "Bakuchi"},
+    {"_id": "turmeric", "name": "Turmeric", "sanskrit_name": "हरिद्रा (Haridra)",
+     "vernacular_names": {"telugu": "పసుపు"}},
+]
+
+
+def index(popularity=None):
+    suggest = SuggestIndex()
+    suggest.rebuild(PLANTS)
+    if popularity:
+        suggest.set_popularity(popularity)
+    return suggest
+
+
+def ids(results):
+    return [result["_id"] for result in results]
+
+
+def test_name_starts_rank_above_inner_words_then_by_name():
+    results = index().suggest("ba")
+    assert ids(results) == ["bael", "bakuchi", "tulsi", "basil"]
+    assert results[2]["matched_name"] == "Holy Basil"
+
+
+def test_popular_plants_rank_first():
+    # Enough scans outweigh matching on an inner word only
+    results = index({"tulsi": 100, "bakuchi": 3}).suggest("ba")
+    assert ids(results) == ["tulsi", "bakuchi", "bael", "basil"]
+    assert results[0]["scans"] == 100
+
+
+def test_limit():
+    suggest = index()
+    assert ids(suggest.suggest("ba", limit=2)) == ["bael", "bakuchi"]
+    assert len(suggest.suggest("b")) == 4
+
+
+def test_preferred_label_for_a_plant_is_shown_once():
+    results = index().suggest("tul")
+    assert ids(results) == ["tulsi"]
+    assert results[0]["matched_name"] == "Tulasi"
+
+
+def test_parenthetical_and_other_script_names():
+    suggest = index()
+    assert suggest.suggest("hari")[0]["matched_name"] == "Haridra"
+    assert ids(suggest.suggest("हरि")) == ["turmeric"]
+    # Latin prefixes reach names written in other scripts through phonetic keys
+    assert suggest.suggest("pasu")[0]["matched_name"] == "పసుపు"
+
+
+def test_no_match_and_blank_query():
+    suggest = index()
+    assert suggest.suggest("xyz") == []
+    assert suggest.suggest("  ") == []
+
+
+def test_cached_short_prefixes_are_invalidated_on_change():
+    suggest = index()
+    assert "bhringraj" not in ids(suggest.suggest("b"))
+    suggest.add({"_id": "bhringraj", "name": "Bhringraj"})
+    assert "bhringraj" in ids(suggest.suggest("b"))
+    suggest.remove("bhringraj")
+    assert "bhringraj" not in ids(suggest.suggest("b"))
+    assert suggest.stats()["plants"] == len(PLANTS)
@@ -0,0 +1,51 @@
+import pytest
+
+from name_index import plant_search_keys
+from transliteration import has_indic, phonetic_key, phonetic_keys, romanize
+
+
+@pytest.mark.parametrize("name", ["तुलसी", "துளசி", "తులసి"])
+def test_tulsi_in_indic_scripts_keys_as_spelled_and_as_spoken(name):
+    assert phonetic_keys(name) == ["tulasi", "tulsi"]
+
+
+@pytest.mark.parametrize("name,key", [("tulsi", "tulsi"), ("Tulasi", "tulasi"), ("Tulasī", "tulasi")])
+def test_latin_spellings_meet_the_indic_keys(name, key):
+    assert phonetic_keys(name) == [key]
+    assert key in phonetic_keys("तुलसी")
+    assert key in phonetic_keys("துளசி")
+    assert key in phonetic_keys("తులసి")
+
+
+@pytest.mark.parametrize("names", [
+    ("हरिद्रा", "Haridra", "Hareedra"),
+    ("పసుపు", "pasupu"),
+    ("मंजिष्ठा", "মঞ্জিষ্ঠা", "Manjishtha"),
+    ("অশ্বগন্ধা", "ಅಶ್ವಗಂಧ", "Ashwagandha"),
+    ("மஞ்சள்", "Manjal"),
+])
+def test_spellings_share_a_key(names):
+    keys = [set(phonetic_keys(name)) for name in names]
+    assert set.intersection(*keys)
+
+
+def test_romanize_leaves_latin_text_alone():
+    assert romanize("Holy Basil (तुलसी)") == "Holy Basil (tulasii)"
+    assert romanize("तुलसी", schwa_deletion=True) == "tulsii"
+    assert not has_indic("Tulsi") and has_indic("Tulsi तुलसी")
+
+
+def test_phonetic_key_folds_spelling_variants():
+    assert phonetic_key("Ashwagandha") == "asvaganda"
+    assert phonetic_key("Shatavari") == phonetic_key("Satawari")
+    assert phonetic_key("Neem") == phonetic_key("Nim")
+
+
+def test_plant_search_keys_cover_every_name():
+    keys = plant_search_keys({
+        "name": "Holy Basil",
+        "sanskrit_name": "तुलसी (Tulasi)",
+        "vernacular_names": {"tamil": "துளசி", "telugu": ["తులసి"]},
+    })
+    assert {"holy basil", "tulasi", "tulsi"} <= set(keys)
+    assert keys == sorted(keys)